@@ -1,10 +1,96 @@
 console.log('Custom video script loaded');
 
+// Attach the adaptive HLS ladder when one is available, keeping the MP4 source as a fallback
+function attachHlsSource(videoElement) {
+    const hlsUrl = videoElement.dataset.hls;
+    if (!hlsUrl) {
+        return;
+    }
+    if (window.Hls && Hls.isSupported()) {
+        const hls = new Hls({
+            startLevel: 0, // Start on the smallest rendition so playback begins quickly
+            manifestLoadingMaxRetry: 10, // The ladder may still be packaging
+            manifestLoadingRetryDelay: 500,
+        });
+        hls.on(Hls.Events.ERROR, (event, data) => {
+            if (data.fatal) {
+                hls.destroy();
+                videoElement.load(); // Fall back to the original MP4 source
+            }
+        });
+        hls.loadSource(hlsUrl);
+        hls.attachMedia(videoElement);
+    } else if (videoElement.canPlayType('application/vnd.apple.mpegurl')) {
+        videoElement.src = hlsUrl;
+    }
+}
+
+// Show sprite-sheet thumbnails while hovering over the seek bar
+function attachSeekPreview(videoElement, seekBar, attempt = 0) {
+    const indexUrl = videoElement.dataset.thumbs;
+    const preview = document.getElementById('seekPreview');
+    if (!indexUrl || !preview || !videoElement.isConnected) {
+        return;
+    }
+    const baseUrl = indexUrl.substring(0, indexUrl.lastIndexOf('/') + 1);
+
+    // The index is fetched once it exists; each sheet is then a single cached image
+    fetch(indexUrl)
+        .then(response => {
+            if (!response.ok) {
+                throw new Error(`HTTP ${response.status}`);
+            }
+            return response.json();
+        })
+        .then(index => {
+            const perSheet = index.columns * index.rows;
+            preview.style.width = index.width + 'px';
+            preview.style.height = index.height + 'px';
+
+            seekBar.addEventListener('mousemove', (event) => {
+                if (!videoElement.duration) {
+                    return;
+                }
+                const rect = seekBar.getBoundingClientRect();
+                const ratio = Math.min(Math.max((event.clientX - rect.left) / rect.width, 0), 1);
+                const n = Math.min(
+                    Math.floor(ratio * videoElement.duration / index.interval),
+                    index.count - 1
+                );
+                const sheet = index.sheets[Math.floor(n / perSheet)];
+                if (!sheet) {
+                    return;
+                }
+                const column = n % index.columns;
+                const row = Math.floor(n / index.columns) % index.rows;
+                preview.style.backgroundImage = `url(${baseUrl}${sheet})`;
+                preview.style.backgroundPosition = `-${column * index.width}px -${row * index.height}px`;
+                const left = ratio * rect.width - index.width / 2;
+                preview.style.left = Math.min(Math.max(left, 0), rect.width - index.width) + 'px';
+                preview.style.display = 'block';
+            });
+            seekBar.addEventListener('mouseleave', () => {
+                preview.style.display = 'none';
+            });
+        })
+        .catch(error => {
+            // Sprites are generated after upload, so poll until the index appears
+            if (attempt < 60) {
+                setTimeout(() => attachSeekPreview(videoElement, seekBar, attempt + 1), 5000);
+            } else {
+                console.log('Seek previews unavailable:', error);
+            }
+        });
+}
+
 // Function to initialize video controls for a given video element
 function initializeVideoControls(videoElement) {
+    attachHlsSource(videoElement);
+
     // Assuming there's a single play/pause button and seek bar for simplicity
     const playPauseBtn = document.getElementById('playPauseBtn'); // Adjust if necessary
     const seekBar = document.getElementById('seekBar');
+    attachSeekPreview(videoElement, seekBar);
 
     // Function to toggle play/pause
     function togglePlayPause() {
@@ -42,10 +128,8 @@ function initializeVideoControls(videoElement) {
     // Initialize canvas for highlighting
     const highlightCanvas = document.getElementById('highlightCanvas');
     const ctx = highlightCanvas.getContext('2d');
-    const markers = [
-        { start: 0, end: 2 }, // Example marker segments in seconds
-        { start: 7, end: 8 }
-    ];
+    let markers = []; // Highlight spans in seconds, fetched from the engagement endpoint
+    let curve = null;
 
     function drawRoundedRect(ctx, x, y, width, height, radius) {
         if (width < 2 * radius) radius = width / 2;
@@ -60,11 +144,15 @@ function initializeVideoControls(videoElement) {
         ctx.fill();
     }
 
-    // Adjust canvas size and draw markers when video metadata is loaded
-    videoElement.addEventListener('loadedmetadata', () => {
+    // Draw the engagement curve and highlight markers over the seek bar
+    function drawEngagement() {
+        if (!videoElement.duration) {
+            return;
+        }
         // Adjust canvas size
         highlightCanvas.width = seekBar.offsetWidth;
         highlightCanvas.height = seekBar.offsetHeight;
+        ctx.clearRect(0, 0, highlightCanvas.width, highlightCanvas.height);
 
         // Draw markers
         markers.forEach(marker => {
@@ -79,9 +167,51 @@ function initializeVideoControls(videoElement) {
         
             // Call drawRoundedRect with the calculated dimensions and radius
             drawRoundedRect(ctx, startX, 0, width, height, radius);
-        });        
-    });
+        });
+
+        // Draw the curve, one point per `step` seconds
+        if (curve && curve.curve.length > 1) {
+            ctx.strokeStyle = "rgba(255, 255, 255, 0.9)";
+            ctx.beginPath();
+            curve.curve.forEach((value, index) => {
+                const x = (index * curve.step / videoElement.duration) * highlightCanvas.width;
+                const y = highlightCanvas.height * (1 - value);
+                if (index === 0) {
+                    ctx.moveTo(x, y);
+                } else {
+                    ctx.lineTo(x, y);
+                }
+            });
+            ctx.stroke();
+        }
+    }
 
+    // Fetch the curve downsampled to roughly one point per pixel of the seek bar
+    function loadEngagement(attempt = 0) {
+        const engagementUrl = videoElement.dataset.engagement;
+        if (!engagementUrl) {
+            return;
+        }
+        const points = Math.max(seekBar.offsetWidth, 100);
+        fetch(`${engagementUrl}?points=${points}`)
+            .then(response => response.json())
+            .then(data => {
+                curve = data;
+                markers = data.highlights.map(([start, end]) => ({ start, end }));
+                drawEngagement();
+                // Analysis runs after upload, so poll until the curve appears
+                if (data.curve.length === 0 && attempt < 60) {
+                    setTimeout(() => loadEngagement(attempt + 1), 5000);
+                }
+            })
+            .catch(error => console.log('Engagement data unavailable:', error));
+    }
+
+    // Adjust canvas size and draw markers when video metadata is loaded
+    videoElement.addEventListener('loadedmetadata', () => {
+        drawEngagement();
+        loadEngagement();
+    });
 
 }
 
@@ -0,0 +1,91 @@
+console.log('Stream upload script loaded');
+
+const UPLOAD_PART_BYTES = 64 * 1024 * 1024; // Each request sends at most this much
+const UPLOAD_RETRIES = 5;
+
+// Reuse one upload id per file, so a reload or a dropped connection resumes it
+function uploadIdFor(file) {
+    const key = `chopstickz-upload:${file.name}:${file.size}:${file.lastModified}`;
+    let uploadId = localStorage.getItem(key);
+    if (!uploadId) {
+        const bytes = crypto.getRandomValues(new Uint8Array(16));
+        uploadId = Array.from(bytes, b => b.toString(16).padStart(2, '0')).join('');
+        localStorage.setItem(key, uploadId);
+    }
+    return [key, uploadId];
+}
+
+function setUploadStatus(text) {
+    const status = document.getElementById('uploadStatus');
+    if (status) {
+        status.textContent = text;
+    }
+}
+
+// Send one byte range; resolves with the server's {offset, media_id} reply
+function sendPart(url, file, start, end, onProgress) {
+    return new Promise((resolve, reject) => {
+        const request = new XMLHttpRequest();
+        request.open('PUT', url);
+        request.setRequestHeader('Content-Range', `bytes ${start}-${end - 1}/${file.size}`);
+        request.upload.onprogress = (event) => onProgress(start + event.loaded);
+        request.onload = () => {
+            if (request.status === 200 || request.status === 409) {
+                resolve(JSON.parse(request.responseText));
+            } else {
+                reject(new Error(`HTTP ${request.status}`));
+            }
+        };
+        request.onerror = () => reject(new Error('network error'));
+        request.send(file.slice(start, end));
+    });
+}
+
+async function uploadFile(uploadUrl, file) {
+    const [key, uploadId] = uploadIdFor(file);
+    const url = `${uploadUrl}/${uploadId}?filename=${encodeURIComponent(file.name)}`;
+    const started = performance.now();
+    const onProgress = (sent) => {
+        const seconds = Math.max((performance.now() - started) / 1000, 0.001);
+        const percent = file.size ? Math.round(100 * sent / file.size) : 100;
+        setUploadStatus(`Uploading ${file.name}: ${percent}% at ${(sent / 1024 ** 2 / seconds).toFixed(1)} MB/s`);
+    };
+
+    // Only the bytes the server does not already have are sent
+    let offset = (await (await fetch(`${uploadUrl}/${uploadId}`)).json()).offset;
+    let failures = 0;
+    while (true) {
+        try {
+            const end = Math.min(offset + UPLOAD_PART_BYTES, file.size);
+            const reply = await sendPart(url, file, offset, end, onProgress);
+            if (reply.media_id) {
+                localStorage.removeItem(key);
+                return reply.media_id;
+            }
+            offset = reply.offset;
+            failures = 0;
+        } catch (error) {
+            if (++failures > UPLOAD_RETRIES) {
+                throw error;
+            }
+            await new Promise(resolve => setTimeout(resolve, 1000 * failures));
+            offset = (await (await fetch(`${uploadUrl}/${uploadId}`)).json()).offset;
+        }
+    }
+}
+
+// Upload every file picked in the upload input; resolves with {media_ids, error}
+async function uploadSelectedFiles(uploadUrl) {
+    const input = document.getElementById('streamUploadInput');
+    const mediaIds = [];
+    try {
+        for (const file of (input && input.files) || []) {
+            mediaIds.push(await uploadFile(uploadUrl, file));
+        }
+        return { media_ids: mediaIds, error: '' };
+    } catch (error) {
+        return { media_ids: mediaIds, error: String(error) };
+    } finally {
+        setUploadStatus('');
+    }
+}
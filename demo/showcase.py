@@ -1,9 +1,16 @@
 """Streamlit demo showcase for Chopstickz AI video editing platform."""
 
+import os
+import sys
+
 import streamlit as st
 from streamlit_option_menu import option_menu
 from streamlit_image_comparison import image_comparison
 
+# Streamlit only puts demo/ on the path; the clip engine lives in tools/.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tools.auto_clip import auto_clip  # noqa: E402
+
 st.set_page_config(page_title="Chopstickz Demo", layout="centered")
 
 with st.sidebar:
@@ -36,10 +43,18 @@ if selected == "Home":
 
 elif selected == "Auto Clip":
     st.title("Auto Clip")
-    video_file = open("assets/clip_3.mp4", "rb")
-    video_bytes = video_file.read()
-    st.write("Entertaining clip captured by our algorithm")
-    st.video(video_bytes)
+    st.write("Entertaining clips captured by our algorithm")
+    source = st.text_input("Stream to clip", "assets/clip_3.mp4")
+    count = st.slider("Number of clips", 1, 30, 5)
+    min_seconds, max_seconds = st.slider("Clip length (seconds)", 5, 120, (15, 60))
+    if st.button("Generate clips"):
+        with st.spinner("Analysing the stream and rendering clips..."):
+            clips = auto_clip(source, "auto_clips", count, min_seconds, max_seconds)
+        if not clips:
+            st.write("No highlights stood out in this stream.")
+        for clip in clips:
+            st.write(f"{clip.start:.0f}s - {clip.end:.0f}s ({clip.method})")
+            st.video(clip.path)
     st.write(
         "Our proudest moment was when our first output was generated. We had selected "
         "a random Pewdiepie Minecraft stream and when we saw the quality of the short "
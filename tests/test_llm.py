@@ -0,0 +1,87 @@
+"""Tests for the LLM providers against an in-process mock transport."""
+
+import asyncio
+import json
+
+import httpx
+
+from webui import llm
+
+
+def collect(provider, messages):
+    """Run a provider's stream to completion and return its text chunks."""
+
+    async def run():
+        try:
+            return [text async for text in provider.stream(messages)]
+        finally:
+            await provider.aclose()
+
+    return asyncio.run(run())
+
+
+def sse(*events) -> bytes:
+    """Encode chat completion chunks as a server-sent event stream."""
+    lines = [f"data: {json.dumps(event)}\n\n" for event in events]
+    return "".join(lines + ["data: [DONE]\n\n"]).encode()
+
+
+def test_openai_retries_503_and_parses_sse():
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(json.loads(request.content))
+        if len(requests) == 1:
+            return httpx.Response(503, text="overloaded")
+        body = sse(
+            {"choices": [{"delta": {"content": "Hel"}}]},
+            {"choices": [{"delta": {"content": "lo"}}]},
+            {"choices": [], "usage": {"prompt_tokens": 7, "completion_tokens": 2}},
+        )
+        return httpx.Response(200, content=body, headers={"content-type": "text/event-stream"})
+
+    provider = llm.OpenAIProvider(
+        base_url="http://openai.test", api_key="key", backoff=0,
+        transport=httpx.MockTransport(handler),
+    )
+    chunks = collect(provider, [{"role": "user", "content": "hi"}])
+
+    assert chunks == ["Hel", "lo"]
+    assert len(requests) == 2
+    assert requests[-1]["stream_options"] == {"include_usage": True}
+    assert provider.usage.retries == 1
+    assert provider.usage.prompt_tokens == 7
+    assert provider.usage.completion_tokens == 2
+
+
+def test_baidu_fetches_one_token_for_concurrent_requests(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm, "BAIDU_TOKEN_PATH", str(tmp_path / "token.json"))
+    token_requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/oauth/2.0/token":
+            token_requests.append(request)
+            return httpx.Response(200, json={"access_token": "token", "expires_in": 3600})
+        assert request.url.params["access_token"] == "token"
+        return httpx.Response(200, json={"result": "answer", "usage": {"prompt_tokens": 3}})
+
+    provider = llm.BaiduProvider(
+        base_url="http://baidu.test", api_key="key", secret_key="secret",
+        transport=httpx.MockTransport(handler),
+    )
+    messages = [{"role": "user", "content": "hi"}]
+
+    async def run():
+        async def ask():
+            return [text async for text in provider.stream(messages)]
+
+        try:
+            return await asyncio.gather(*(ask() for _ in range(4)))
+        finally:
+            await provider.aclose()
+
+    answers = asyncio.run(run())
+
+    assert answers == [["answer"]] * 4
+    assert len(token_requests) == 1
+    assert provider.usage.prompt_tokens == 12
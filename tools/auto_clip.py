@@ -0,0 +1,197 @@
+"""Select the most engaging windows of a video and render them as clips in parallel.
+
+Usage::
+
+    python -m tools.auto_clip vods/stream.mp4 --count 20 --output-dir clips/
+"""
+
+import argparse
+import bisect
+import heapq
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import ffmpeg
+import numpy as np
+
+from tools.audio_analysis import analyze_audio
+from tools.engagement import SCORE_SIGNAL, engagement_store
+from tools.media_info import MediaInfo, media_index
+from tools.scene_detect import SHOT_SIGNAL, analyze_scenes, snap_to_shot
+from tools.smart_cut import smart_trim
+
+DEFAULT_CLIP_COUNT = 20
+MIN_CLIP_SECONDS = 15
+MAX_CLIP_SECONDS = 60
+# A clip starting this close to a keyframe is moved onto it and stream-copied.
+COPY_TOLERANCE_SECONDS = 0.5
+
+
+@dataclass(frozen=True)
+class Clip:
+    """One rendered highlight and how it was produced."""
+
+    start: float
+    end: float
+    score: float
+    method: str = ""
+    path: str = ""
+
+
+def select_windows(score: np.ndarray, count: int = DEFAULT_CLIP_COUNT,
+                   min_seconds: int = MIN_CLIP_SECONDS,
+                   max_seconds: int = MAX_CLIP_SECONDS) -> list[tuple[int, int, float]]:
+    """Return up to count non-overlapping (start, end, value) windows, best first.
+
+    A window's value is its summed score above the median, so a window only
+    grows while the extra seconds are more engaging than usual. Prefix sums
+    give the best length for every start at once; candidates are then taken
+    from a heap, skipping any that overlap a window already chosen.
+    """
+    if not 0 < min_seconds <= max_seconds:
+        raise ValueError("Clip lengths need 0 < min_seconds <= max_seconds.")
+    score = np.asarray(score, dtype=np.float64)
+    seconds = len(score)
+    if seconds < min_seconds:
+        return []
+    prefix = np.concatenate([[0.0], np.cumsum(score - np.median(score))])
+
+    starts = np.arange(seconds - min_seconds + 1)
+    lengths = np.arange(min_seconds, max_seconds + 1)
+    ends = np.minimum(starts[:, None] + lengths[None, :], seconds)
+    values = prefix[ends] - prefix[starts][:, None]
+    best = values.argmax(axis=1)
+    best_ends = ends[starts, best]
+    best_values = values[starts, best]
+
+    candidates = [
+        (-value, start, end)
+        for start, end, value in zip(starts.tolist(), best_ends.tolist(), best_values.tolist())
+        if value > 0
+    ]
+    heapq.heapify(candidates)
+    chosen_starts, chosen = [], []
+    while candidates and len(chosen) < count:
+        negative_value, start, end = heapq.heappop(candidates)
+        position = bisect.bisect_right(chosen_starts, start)
+        if position and chosen[position - 1][1] > start:
+            continue
+        if position < len(chosen) and chosen[position][0] < end:
+            continue
+        chosen_starts.insert(position, start)
+        chosen.insert(position, (start, end, -negative_value))
+    return sorted(chosen, key=lambda window: -window[2])
+
+
+def _copy_clip(video_path: str, start: float, end: float, output_path: str):
+    """Stream-copy a clip that starts on a keyframe."""
+    (
+        ffmpeg.input(video_path, ss=start, t=end - start)
+        .output(output_path, c="copy", avoid_negative_ts="make_zero", movflags="faststart")
+        .overwrite_output()
+        .run(quiet=True)
+    )
+
+
+def _encode_clip(video_path: str, start: float, end: float, output_path: str):
+    """Re-encode a clip that can be neither copied nor smart-cut."""
+    (
+        ffmpeg.input(video_path, ss=start, t=end - start)
+        .output(output_path, vcodec="libx264", crf=20, acodec="aac", movflags="faststart")
+        .overwrite_output()
+        .run(quiet=True)
+    )
+
+
+def render_clip(video_path: str, start: float, end: float, output_path: str,
+                info: MediaInfo) -> str:
+    """Render one clip with the cheapest method that suits it and return the method.
+
+    Clips starting near a keyframe are stream-copied from it; otherwise the
+    edges are smart-cut, with a full re-encode as the last resort.
+    """
+    keyframes = info.keyframes or ()
+    position = bisect.bisect_left(keyframes, start - COPY_TOLERANCE_SECONDS)
+    if position < len(keyframes) and abs(keyframes[position] - start) <= COPY_TOLERANCE_SECONDS:
+        _copy_clip(video_path, keyframes[position], end, output_path)
+        return "copy"
+    if smart_trim(video_path, start, end, output_path, info):
+        return "smart-cut"
+    _encode_clip(video_path, start, end, output_path)
+    return "encode"
+
+
+def auto_clip(video_path: str, output_dir: str, count: int = DEFAULT_CLIP_COUNT,
+              min_seconds: int = MIN_CLIP_SECONDS, max_seconds: int = MAX_CLIP_SECONDS,
+              digest: str = None, workers: int = None) -> list[Clip]:
+    """Render the count most engaging windows of a video into output_dir.
+
+    The video is analysed first if it has no engagement score yet. Clip
+    edges snap to nearby shot boundaries so clips do not open mid-shot.
+    Raises ValueError unless 0 < min_seconds <= max_seconds.
+    """
+    if not 0 < min_seconds <= max_seconds:
+        raise ValueError("Clip lengths need 0 < min_seconds <= max_seconds.")
+    digest = digest or media_index.digest(video_path)
+    if SCORE_SIGNAL not in engagement_store.signals(digest):
+        analyze_audio(video_path, digest)
+        analyze_scenes(video_path, digest)
+    if SCORE_SIGNAL not in engagement_store.signals(digest):
+        return []
+    info = media_index.get(video_path, keyframes=True)
+    shots = engagement_store.events(digest, SHOT_SIGNAL)
+
+    score = np.asarray(engagement_store.column(digest, SCORE_SIGNAL))
+    clips = []
+    for start, end, value in select_windows(score, count, min_seconds, max_seconds):
+        snapped_start = snap_to_shot(float(start), shots)
+        snapped_end = min(snap_to_shot(float(end), shots), info.duration)
+        # Snapping both edges onto one shot boundary would leave nothing to render.
+        if snapped_end > snapped_start:
+            start, end = snapped_start, snapped_end
+        clips.append(Clip(float(start), min(float(end), info.duration), round(value, 3)))
+
+    os.makedirs(output_dir, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(video_path))[0]
+
+    def render(numbered):
+        number, clip = numbered
+        output_path = os.path.join(output_dir, f"{stem}-clip{number:02d}.mp4")
+        method = render_clip(video_path, clip.start, clip.end, output_path, info)
+        return Clip(clip.start, clip.end, clip.score, method, output_path)
+
+    # Every clip is an independent ffmpeg process, so threads only supervise them.
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+        return list(pool.map(render, enumerate(clips, start=1)))
+
+
+def main(argv: list[str] = None) -> int:
+    """Render the top highlights of one video from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("video", help="source video")
+    parser.add_argument("-o", "--output-dir", default="clips")
+    parser.add_argument("-n", "--count", type=int, default=DEFAULT_CLIP_COUNT)
+    parser.add_argument("--min-seconds", type=int, default=MIN_CLIP_SECONDS)
+    parser.add_argument("--max-seconds", type=int, default=MAX_CLIP_SECONDS)
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="number of clips to render at once")
+    args = parser.parse_args(argv)
+    if not 0 < args.min_seconds <= args.max_seconds:
+        parser.error("--min-seconds must be positive and no more than --max-seconds")
+
+    try:
+        clips = auto_clip(args.video, args.output_dir, args.count, args.min_seconds,
+                          args.max_seconds, workers=args.jobs)
+    except ffmpeg.Error as e:
+        stderr = e.stderr.decode() if e.stderr else "Unknown FFmpeg error"
+        print(f"Failed to generate clips: {stderr}")
+        return 1
+    for clip in clips:
+        print(f"{clip.start:8.1f}s - {clip.end:8.1f}s  {clip.method:9}  {clip.path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+"""Headless batch CLI that applies command scripts to many videos in parallel.
+
+The manifest is a JSON list, or JSON Lines, of jobs such as::
+
+    {"input": "vods/stream.mp4", "commands": ["trim the video by 5 seconds on each side",
+                                              "crop to mobile dimensions"]}
+
+Commands are the edit phrases the editor accepts, plus "undo", which drops
+the previous edit; player controls such as "play" are rejected. An optional
+"output" overrides the generated output path. Every job appends
+a result record to the results file, and rerunning the same manifest skips
+jobs that already succeeded.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import ffmpeg
+
+from tools.commands import compile_command
+from tools.edit_list import EditList
+
+
+def job_id(job: dict) -> str:
+    """Identify a job by its input and command script."""
+    payload = json.dumps(
+        {"input": os.path.abspath(job["input"]), "commands": job.get("commands", [])},
+        sort_keys=True,
+    )
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def load_manifest(manifest_path: str) -> list[dict]:
+    """Read jobs from a JSON list or a JSON Lines file."""
+    with open(manifest_path) as manifest_file:
+        text = manifest_file.read().strip()
+    if text.startswith("["):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def load_results(results_path: str) -> dict[str, dict]:
+    """Return the latest result record of every job in a results file."""
+    results = {}
+    if os.path.exists(results_path):
+        with open(results_path) as results_file:
+            for line in results_file:
+                if line.strip():
+                    record = json.loads(line)
+                    results[record["job_id"]] = record
+    return results
+
+
+def run_job(job: dict, output_dir: str, smart_cut: bool = True, chunks: int = 1) -> dict:
+    """Apply a job's command script to its input and return a result record.
+
+    Any failure, including a malformed job, is recorded rather than raised,
+    so one bad job never aborts the batch.
+    """
+    timings = {}
+    record = {
+        "job_id": None,
+        "input": job.get("input"),
+        "commands": job.get("commands", []),
+        "output": None,
+        "status": "error",
+        "error": None,
+        "timings": timings,
+    }
+    started = time.perf_counter()
+
+    try:
+        identifier = record["job_id"] = job_id(job)
+        edit_list = EditList(job["input"])
+        timings["probe"] = time.perf_counter() - started
+
+        for command in record["commands"]:
+            compiled = compile_command(command)
+            if compiled is not None and compiled.action == "undo":
+                if not len(edit_list):
+                    raise ValueError(f"Nothing to undo: {command}")
+                edit_list.pop()
+                continue
+            if compiled is None or compiled.operation is None:
+                raise ValueError(f"Unknown command: {command}")
+            edit_list.append(compiled.operation)
+
+        stem = os.path.splitext(os.path.basename(job["input"]))[0]
+        output_path = job.get("output") or os.path.join(
+            output_dir, f"{stem}-{identifier[:8]}.mp4"
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        render_started = time.perf_counter()
+        edit_list.render(output_path, smart_cut=smart_cut, chunks=chunks)
+        timings["render"] = time.perf_counter() - render_started
+        record.update(status="ok", output=output_path)
+    except ffmpeg.Error as e:
+        record["error"] = e.stderr.decode() if e.stderr else "Unknown FFmpeg error"
+    except (OSError, ValueError) as e:
+        record["error"] = str(e) or type(e).__name__
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+
+    timings["total"] = time.perf_counter() - started
+    return record
+
+
+def main(argv: list[str] = None) -> int:
+    """Run every pending job in a manifest across a process pool."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("manifest", help="JSON or JSON Lines job manifest")
+    parser.add_argument("-o", "--output-dir", default="batch_output")
+    parser.add_argument("-r", "--results", help="results file (default: OUTPUT_DIR/results.jsonl)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="number of jobs to run at once")
+    parser.add_argument("--force", action="store_true", help="rerun jobs that already succeeded")
+    parser.add_argument("--no-smart-cut", action="store_true",
+                        help="always re-encode trims instead of copying whole GOPs")
+    parser.add_argument("--chunks", type=int, default=1,
+                        help="split each render into this many keyframe-aligned chunks")
+    args = parser.parse_args(argv)
+
+    results_path = args.results or os.path.join(args.output_dir, "results.jsonl")
+    os.makedirs(os.path.dirname(os.path.abspath(results_path)), exist_ok=True)
+    previous = {} if args.force else load_results(results_path)
+
+    pending = []
+    for job in load_manifest(args.manifest):
+        record = previous.get(job_id(job)) if "input" in job else None
+        if record and record["status"] == "ok" and os.path.exists(record["output"]):
+            continue
+        pending.append(job)
+    print(f"{len(pending)} job(s) to run, {args.jobs} at a time.")
+
+    failures = 0
+    with ProcessPoolExecutor(max_workers=max(1, args.jobs)) as pool, open(
+        results_path, "a"
+    ) as results_file:
+        futures = [
+            pool.submit(run_job, job, args.output_dir, not args.no_smart_cut, args.chunks)
+            for job in pending
+        ]
+        for future in as_completed(futures):
+            record = future.result()
+            results_file.write(json.dumps(record) + "\n")
+            results_file.flush()
+            if record["status"] == "ok":
+                print(f"ok     {record['input']} -> {record['output']} "
+                      f"({record['timings']['total']:.1f}s)")
+            else:
+                failures += 1
+                print(f"failed {record['input']}: {record['error'].strip()}")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
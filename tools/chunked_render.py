@@ -0,0 +1,201 @@
+"""Render long edit lists as keyframe-aligned chunks encoded in parallel."""
+
+import bisect
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import ffmpeg
+
+from tools.jump_cut import cut_streams, kept_before, span_pairs
+from tools.media_info import media_index
+from tools.smart_cut import run_quietly
+
+# Share of a chunked render's progress taken by the chunks; the join takes the rest.
+CHUNKS_SHARE = 0.9
+
+
+def _map_time(edit_list, source_time: float):
+    """Yield (operation, state, time) as a source timestamp moves through the edits."""
+    time = source_time
+    for operation, state in zip(edit_list.operations, edit_list.states):
+        yield operation, state, time
+        if operation.name == "trim":
+            time -= operation.args[0]
+        elif operation.name == "speed":
+            time /= operation.args[0]
+        elif operation.name == "jump_cut":
+            time = kept_before(span_pairs(operation.args), time)
+
+
+def _can_split(edit_list, source_time: float) -> bool:
+    """Return False if a split at source_time would land inside a fade."""
+    for operation, state, time in _map_time(edit_list, source_time):
+        if operation.name == "fade_in" and 0 < time < operation.args[0]:
+            return False
+        if operation.name == "fade_out" and (
+            state.duration - operation.args[0] < time < state.duration
+        ):
+            return False
+    return True
+
+
+def plan_chunks(edit_list, chunks: int) -> list[tuple[float, float]]:
+    """Split the source into up to chunks ranges that start on keyframes."""
+    source_duration = edit_list.source_state.duration
+    keyframes = media_index.get(edit_list.source_path, keyframes=True).keyframes or ()
+    splits = [
+        time for time in keyframes if 0 < time < source_duration and _can_split(edit_list, time)
+    ]
+
+    boundaries = [0.0]
+    for index in range(1, chunks):
+        target = source_duration * index / chunks
+        position = bisect.bisect_left(splits, target)
+        nearest = min(
+            splits[max(position - 1, 0): position + 1], key=lambda t: abs(t - target), default=None
+        )
+        if nearest is not None and nearest > boundaries[-1]:
+            boundaries.append(nearest)
+    boundaries.append(source_duration)
+    return list(zip(boundaries, boundaries[1:]))
+
+
+def chunk_streams(edit_list, source_start: float, source_end: float):
+    """Build (video, audio, output seconds) for one chunk; video is None if the edits drop it.
+
+    Timestamps inside a chunk start at zero, so trims and fades are shifted
+    by the chunk's offset in each intermediate timeline. Audio is None when
+    the source has no audio track.
+    """
+    # The edit list imports this module, so import its helper lazily.
+    from tools.edit_list import atempo_chain
+
+    source = ffmpeg.input(edit_list.source_path, ss=source_start, t=source_end - source_start)
+    video = source.video
+    audio = source.audio if edit_list.source_state.has_audio else None
+    start, end = source_start, source_end
+
+    for operation, state in zip(edit_list.operations, edit_list.states):
+        if operation.name == "trim":
+            trim_start, trim_end = operation.args
+            keep_start = max(start, trim_start)
+            keep_end = min(end, state.duration - trim_end)
+            if keep_end <= keep_start:
+                return None, None, 0.0
+            video = video.trim(start=keep_start - start, end=keep_end - start).setpts(
+                "PTS-STARTPTS"
+            )
+            if audio is not None:
+                audio = audio.filter(
+                    "atrim", start=keep_start - start, end=keep_end - start
+                ).filter("asetpts", "PTS-STARTPTS")
+            start, end = keep_start - trim_start, keep_end - trim_start
+
+        elif operation.name in ("crop", "zoom"):
+            result = state.apply(operation)
+            video = video.filter(
+                "crop",
+                w=result.width,
+                h=result.height,
+                x=(state.width - result.width) // 2,
+                y=(state.height - result.height) // 2,
+            )
+
+        elif operation.name == "speed":
+            (factor,) = operation.args
+            video = video.filter("setpts", f"{1/factor}*PTS")
+            if audio is not None:
+                audio = atempo_chain(audio, factor)
+            start, end = start / factor, end / factor
+
+        elif operation.name == "jump_cut":
+            spans = [
+                (max(span_start, start) - start, min(span_end, end) - start)
+                for span_start, span_end in span_pairs(operation.args)
+                if span_start < end and span_end > start
+            ]
+            if not spans:
+                return None, None, 0.0
+            video, audio = cut_streams(video, audio, spans)
+            spans = span_pairs(operation.args)
+            start, end = kept_before(spans, start), kept_before(spans, end)
+
+        elif operation.name == "fade_in":
+            (duration,) = operation.args
+            # Splits never fall inside a fade, so only a chunk starting at 0 overlaps it.
+            if start < duration:
+                video = video.filter("fade", t="in", d=duration)
+                if audio is not None:
+                    audio = audio.filter("afade", t="in", d=duration)
+
+        elif operation.name == "fade_out":
+            (duration,) = operation.args
+            fade_start = state.duration - duration
+            if end > fade_start:
+                video = video.filter("fade", t="out", start_time=fade_start - start, d=duration)
+                if audio is not None:
+                    audio = audio.filter("afade", t="out", st=fade_start - start, d=duration)
+
+    return video, audio, end - start
+
+
+def _concat_input(work_dir: str, list_name: str, paths: list[str]):
+    """Open paths back to back through the concat demuxer."""
+    list_path = os.path.join(work_dir, list_name)
+    with open(list_path, "w") as list_file:
+        list_file.writelines(f"file '{path}'\n" for path in paths)
+    return ffmpeg.input(list_path, f="concat", safe=0)
+
+
+def render_chunked(edit_list, output_path: str, chunks: int = None, runner=None,
+                   **output_kwargs):
+    """Render edit_list by encoding keyframe-aligned chunks in parallel.
+
+    Each chunk writes its video and, cut at the same timestamps, its audio
+    as PCM. Video chunks are joined with the concat demuxer without
+    re-encoding, and the PCM is joined sample-exactly and encoded once.
+    Every command goes through runner, with chunks sharing most of the
+    progress by their output length and the final join the rest.
+    """
+    runner = runner or run_quietly
+    chunks = chunks or os.cpu_count() or 1
+    ranges = plan_chunks(edit_list, chunks)
+    video_kwargs = {"vcodec": "libx264", "crf": 22, "an": None}
+    video_kwargs.update(output_kwargs)
+    workers = min(len(ranges), os.cpu_count() or 1)
+    video_kwargs.setdefault("threads", max(1, (os.cpu_count() or 1) // workers))
+
+    work_dir = tempfile.mkdtemp(prefix="chunked-")
+    try:
+        commands, video_paths, audio_paths = [], [], []
+        for index, (start, end) in enumerate(ranges):
+            video, audio, duration = chunk_streams(edit_list, start, end)
+            if video is None:
+                continue
+            video_paths.append(os.path.join(work_dir, f"chunk{index:04d}.mp4"))
+            outputs = [ffmpeg.output(video, video_paths[-1], **video_kwargs)]
+            if audio is not None:
+                audio_paths.append(os.path.join(work_dir, f"chunk{index:04d}.wav"))
+                outputs.append(ffmpeg.output(audio, audio_paths[-1], acodec="pcm_s16le"))
+            commands.append((ffmpeg.merge_outputs(*outputs).overwrite_output(), duration))
+
+        total = sum(duration for _, duration in commands) or 1.0
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(runner, command, duration, CHUNKS_SHARE * duration / total)
+                for command, duration in commands
+            ]
+            for future in futures:
+                future.result()
+
+        streams = [_concat_input(work_dir, "video.txt", video_paths).video]
+        output_options = {"vcodec": "copy"}
+        if audio_paths:
+            streams.append(_concat_input(work_dir, "audio.txt", audio_paths).audio)
+            output_options["acodec"] = "aac"
+        output = ffmpeg.output(*streams, output_path, **output_options).overwrite_output()
+        runner(output, edit_list.state.duration, 1 - CHUNKS_SHARE)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
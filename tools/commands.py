@@ -0,0 +1,240 @@
+"""Compile editor command phrases into edit operations and player actions.
+
+Both front ends run phrases through this grammar before anything else, so
+known intents resolve locally and only unrecognised text reaches an LLM.
+Each rule is a precompiled regular expression over a normalised phrase,
+with synonyms folded into alternations and numbers parsed with their units.
+"""
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+
+from tools.edit_list import EditOperation
+
+DEFAULT_FADE_SECONDS = 2
+DEFAULT_ZOOM_SCALE = 0.9
+
+WORD_NUMBERS = {
+    "zero": 0, "half": 0.5, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10, "fifteen": 15,
+    "twenty": 20, "thirty": 30, "sixty": 60,
+}
+SECOND_UNITS = {
+    "ms": 0.001, "millisecond": 0.001, "milliseconds": 0.001,
+    "s": 1, "sec": 1, "secs": 1, "second": 1, "seconds": 1,
+    "m": 60, "min": 60, "mins": 60, "minute": 60, "minutes": 60,
+    "h": 3600, "hr": 3600, "hrs": 3600, "hour": 3600, "hours": 3600,
+}
+ASPECT_RATIOS = {
+    "mobile": 9 / 16, "vertical": 9 / 16, "portrait": 9 / 16, "phone": 9 / 16,
+    "tiktok": 9 / 16, "shorts": 9 / 16, "reels": 9 / 16,
+    "square": 1.0, "instagram": 1.0,
+    "landscape": 16 / 9, "widescreen": 16 / 9,
+}
+
+
+def _alternation(words) -> str:
+    # Longest first, so "ms" is tried before "m" and "seconds" before "s".
+    return "|".join(sorted(map(re.escape, words), key=len, reverse=True))
+
+
+NUMBER = rf"-?(?:\d+(?:\.\d+)?|\.\d+|{_alternation(WORD_NUMBERS)})"
+DURATION = rf"(?:\d+:[0-5]?\d(?:\.\d+)?|{NUMBER} ?(?:{_alternation(SECOND_UNITS)})?)"
+FACTOR = rf"{NUMBER} ?(?:x|times|%|percent)?"
+RATIO = rf"(?:\d+(?:\.\d+)? ?[:/x] ?\d+(?:\.\d+)?|{_alternation(ASPECT_RATIOS)})"
+# An optional object such as " the video" or " it" after a verb.
+OBJECT = r"(?: (?:the |this )?(?:video|clip|stream|vod|footage)| it)?"
+POLITE = re.compile(
+    r"^(?:(?:please|can you|could you|would you|i want to|i'd like to|let's|lets) )+"
+    r"|(?: please)+$"
+)
+
+
+@dataclass(frozen=True)
+class Command:
+    """A compiled command: an edit operation or a player action with a value."""
+
+    action: str
+    operation: EditOperation = None
+    value: float = None
+
+
+def normalize_phrase(command: str) -> str:
+    """Lower-case a phrase and strip punctuation, extra spaces and politeness."""
+    text = re.sub(r"[^\w\s.:%/'-]", " ", command.lower())
+    text = " ".join(text.split()).rstrip(". ")
+    return POLITE.sub("", text).strip()
+
+
+def parse_number(text: str) -> float:
+    """Parse a numeral or number word."""
+    text = text.strip()
+    return float(WORD_NUMBERS[text]) if text in WORD_NUMBERS else float(text)
+
+
+def parse_seconds(text: str) -> float:
+    """Parse a duration such as "5", "1.5s", "two minutes" or "1:30" into seconds."""
+    if ":" in text:
+        minutes, seconds = text.split(":")
+        if float(seconds) >= 60:
+            raise ValueError("Invalid timestamp.")
+        return int(minutes) * 60 + float(seconds)
+    match = re.fullmatch(rf"({NUMBER}) ?([a-z]*)", text)
+    return parse_number(match.group(1)) * SECOND_UNITS.get(match.group(2), 1)
+
+
+def parse_factor(text: str) -> tuple[float, bool]:
+    """Parse "2", "2x" or "150%" into (value, whether it was a percentage)."""
+    match = re.fullmatch(rf"({NUMBER}) ?(x|times|%|percent)?", text)
+    percent = match.group(2) in ("%", "percent")
+    value = parse_number(match.group(1))
+    return (value / 100 if percent else value), percent
+
+
+def parse_ratio(text: str) -> float:
+    """Parse a named aspect ratio or "W:H" into a width/height ratio."""
+    if text in ASPECT_RATIOS:
+        return ASPECT_RATIOS[text]
+    width, height = (float(part) for part in re.split(r" ?[:/x] ?", text))
+    if width <= 0 or height <= 0:
+        raise ValueError("Invalid aspect ratio.")
+    return width / height
+
+
+def _fade(match) -> Command:
+    seconds = DEFAULT_FADE_SECONDS
+    if match.group("q"):
+        seconds = parse_seconds(match.group("q"))
+    if seconds <= 0:
+        raise ValueError("Invalid fade length.")
+    return Command("edit", EditOperation(f"fade_{match.group('dir')}", (seconds,)))
+
+
+def _zoom(match) -> Command:
+    scale = DEFAULT_ZOOM_SCALE
+    if match.group("q"):
+        amount, percent = parse_factor(match.group("q"))
+        # "zoom in 20%" crops a fifth of the frame away; "zoom in 2x" magnifies.
+        scale = 1 - amount if percent else 1 / amount if amount > 0 else 0
+    if not 0 < scale < 1:
+        raise ValueError("Invalid zoom amount.")
+    return Command("edit", EditOperation("zoom", (scale,)))
+
+
+def _speed(match) -> Command:
+    if not match.group("q"):
+        raise ValueError("Invalid speed factor.")
+    factor, percent = parse_factor(match.group("q"))
+    slower = match.group("dir").startswith("slow")
+    # "to 150%" is the resulting speed; "by 50%" changes it by half in the
+    # verb's direction, and a bare factor divides it when slowing down.
+    if percent and match.group("prep") != "to":
+        factor = 1 - factor if slower else 1 + factor
+    elif slower and not percent:
+        factor = 1 / factor if factor > 0 else 0
+    if factor <= 0:
+        raise ValueError("Invalid speed factor.")
+    return Command("edit", EditOperation("speed", (factor,)))
+
+
+def _named_speed(match) -> Command:
+    factor = {"double": 2.0, "twice": 2.0, "half": 0.5}[match.group("word")]
+    return Command("edit", EditOperation("speed", (factor,)))
+
+
+def _set_speed(match) -> Command:
+    factor, _ = parse_factor(match.group("q"))
+    if factor <= 0:
+        raise ValueError("Invalid speed factor.")
+    return Command("edit", EditOperation("speed", (factor,)))
+
+
+def _trim(match) -> Command:
+    seconds = parse_seconds(match.group("q"))
+    if seconds <= 0:
+        raise ValueError("Invalid trim length.")
+    where = match.group("where")
+    if where == "first" or re.fullmatch(START, where):
+        return Command("edit", EditOperation("trim", (seconds, 0)))
+    if where == "last" or re.fullmatch(END, where):
+        return Command("edit", EditOperation("trim", (0, seconds)))
+    return Command("edit", EditOperation("trim", (seconds, seconds)))
+
+
+def _crop(match) -> Command:
+    return Command("edit", EditOperation("crop", (parse_ratio(match.group("target")),)))
+
+
+def _jump_cut(match) -> Command:
+    # The silent spans are detected when the edit is appended to an edit list.
+    return Command("edit", EditOperation("jump_cut"))
+
+
+def _seek(match) -> Command:
+    seconds = parse_seconds(match.group("q"))
+    if seconds < 0:
+        raise ValueError("Invalid timestamp.")
+    return Command("seek", value=seconds)
+
+
+def _action(name: str, value: float = None):
+    return lambda match: Command(name, value=value)
+
+
+TRIM_VERB = rf"(?:trim|cut|chop|shave|remove)(?: off)?{OBJECT}"
+START = r"(?:from|off|at) (?:the )?(?:start|beginning|front)"
+END = r"(?:from|off|at) (?:the )?end"
+SIDES = r"(?:on |from |off |at )?(?:each|both) (?:side|sides|end|ends)"
+
+RULES = [
+    (rf"fade[ -]?(?P<dir>in|out){OBJECT}(?: (?:over|for|of|by|in))?(?: (?P<q>{DURATION}))?",
+     _fade),
+    (rf"(?:zoom|punch)(?: in)?{OBJECT}(?: (?:by|to))?(?: (?P<q>{FACTOR}))?", _zoom),
+    (rf"(?P<dir>speed up|speed|faster|slow down|slower|slow){OBJECT}"
+     rf"(?: (?P<prep>by|to|a factor of))?(?: (?P<q>{FACTOR}))?", _speed),
+    (rf"(?:play |set speed to |make{OBJECT} )?(?P<word>double|twice|half)(?: the)? speed",
+     _named_speed),
+    (rf"(?:play |set speed to )?(?:at )?(?P<q>{FACTOR}) speed", _set_speed),
+    (rf"(?:jump[ -]?cut{OBJECT}|(?:cut|remove|trim|strip|delete|drop)(?: out)?(?: all)?(?: the)? "
+     rf"(?:dead air|silences?|silent parts|pauses|dead space)(?: from{OBJECT})?)", _jump_cut),
+    (rf"{TRIM_VERB}(?: by)? (?P<q>{DURATION})(?: off)? (?P<where>{SIDES}|{START}|{END})", _trim),
+    (rf"{TRIM_VERB} the (?P<where>first|last) (?P<q>{DURATION})", _trim),
+    (rf"(?:crop|reframe|resize|make|convert){OBJECT}(?: (?:to|for|into|as))?(?: an?)? "
+     rf"(?P<target>{RATIO})(?: (?:dimensions|format|aspect(?: ratio)?|ratio|size|video))?", _crop),
+    (r"undo(?: that| it| the last(?: edit| change| action)?| last(?: edit| change| action)?)?",
+     _action("undo")),
+    (r"cancel(?: the)?(?: renders?| rendering)?|stop(?: the)? (?:renders?|rendering)",
+     _action("cancel")),
+    (rf"(?:play|resume|start){OBJECT}|(?:start|resume) playback", _action("play")),
+    (rf"(?:pause|stop){OBJECT}|(?:pause|stop) playback", _action("pause")),
+    (r"next frame|step(?: one frame)? forward|frame forward", _action("step", 1)),
+    (r"(?:previous|prev|last) frame|step(?: one frame)? back(?:ward)?|frame back",
+     _action("step", -1)),
+    (rf"(?:go|jump|seek|skip)(?: to)? (?P<q>{DURATION})", _seek),
+    (rf"(?:export|save|render){OBJECT}", _action("export")),
+]
+COMPILED_RULES = [(re.compile(pattern), handler) for pattern, handler in RULES]
+
+
+@lru_cache(maxsize=1024)
+def compile_command(command: str) -> Command:
+    """Return the command a phrase means, or None if the grammar does not cover it.
+
+    Raises ValueError when the phrase is recognised but its number is invalid.
+    """
+    text = normalize_phrase(command)
+    for pattern, handler in COMPILED_RULES:
+        match = pattern.fullmatch(text)
+        if match:
+            return handler(match)
+    return None
+
+
+def parse_command(command: str) -> EditOperation:
+    """Return the edit operation for a command phrase, or None if it is not an edit.
+
+    Raises ValueError when the phrase is recognised but its number is invalid.
+    """
+    compiled = compile_command(command)
+    return compiled.operation if compiled is not None else None
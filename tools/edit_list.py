@@ -0,0 +1,299 @@
+"""Non-destructive edit list compiled into a single ffmpeg filtergraph."""
+
+import math
+from dataclasses import dataclass, replace
+from typing import Optional
+
+import ffmpeg
+
+from tools.chunked_render import render_chunked
+from tools.jump_cut import MAX_GRAPH_SPANS, cut_streams, detect_speech_spans, span_pairs
+from tools.media_info import media_index
+from tools.smart_cut import run_quietly, smart_trim
+
+EDIT_OPERATIONS = ("trim", "crop", "zoom", "speed", "fade_in", "fade_out", "jump_cut")
+
+
+@dataclass(frozen=True)
+class EditOperation:
+    """A single recorded edit and its numeric arguments."""
+
+    name: str
+    args: tuple[float, ...] = ()
+
+    def __post_init__(self):
+        if self.name not in EDIT_OPERATIONS:
+            raise ValueError(f"Unknown edit operation: {self.name}")
+
+
+@dataclass(frozen=True)
+class ClipState:
+    """Geometry and timing of the clip at one point in the edit list."""
+
+    width: int
+    height: int
+    duration: float
+    has_audio: bool = True
+
+    def apply(self, operation: EditOperation) -> "ClipState":
+        """Return the state produced by applying an operation to this one."""
+        if operation.name == "trim":
+            start, end = operation.args
+            duration = self.duration - start - end
+            if duration <= 0:
+                raise ValueError("The resulting duration is non-positive after trimming.")
+            return replace(self, duration=duration)
+
+        if operation.name == "crop":
+            (scale,) = operation.args
+            width = int(self.height * scale)
+            width -= width % 2
+            if not 0 < width <= self.width:
+                raise ValueError(f"Crop scale {scale} does not fit a {self.width}px frame.")
+            return replace(self, width=width)
+
+        if operation.name == "zoom":
+            (scale,) = operation.args
+            width = int(self.width * scale)
+            height = int(self.height * scale)
+            width += width % 2
+            height += height % 2
+            if not (0 < width <= self.width and 0 < height <= self.height):
+                raise ValueError(f"Zoom scale {scale} is out of range.")
+            return replace(self, width=width, height=height)
+
+        if operation.name == "speed":
+            (factor,) = operation.args
+            if factor <= 0:
+                raise ValueError("Speed factor must be positive.")
+            return replace(self, duration=self.duration / factor)
+
+        if operation.name == "jump_cut":
+            spans = span_pairs(operation.args)
+            if not spans:
+                raise ValueError("A jump cut needs at least one span to keep.")
+            bounds = [time for span in spans for time in span]
+            if bounds != sorted(bounds) or bounds[0] < 0 or bounds[-1] > self.duration + 0.05:
+                raise ValueError("Jump-cut spans must be ordered and within the clip.")
+            return replace(self, duration=sum(end - start for start, end in spans))
+
+        (duration,) = operation.args
+        if not 0 < duration <= self.duration:
+            raise ValueError(f"Fade duration {duration} exceeds the clip length.")
+        return self
+
+
+def normalize_operations(operations) -> tuple[EditOperation, ...]:
+    """Collapse an operation chain to a canonical form with the same output.
+
+    Adjacent trims and speed changes are merged, and no-op edits are dropped,
+    so equivalent chains share render cache entries.
+    """
+    normalized: list[EditOperation] = []
+    for operation in operations:
+        previous = normalized[-1] if normalized else None
+        if previous is not None and previous.name == operation.name == "trim":
+            merged = tuple(a + b for a, b in zip(previous.args, operation.args))
+            normalized[-1] = EditOperation("trim", merged)
+        elif previous is not None and previous.name == operation.name == "speed":
+            normalized[-1] = EditOperation("speed", (previous.args[0] * operation.args[0],))
+        else:
+            normalized.append(operation)
+
+        last = normalized[-1]
+        if (last.name == "trim" and last.args == (0, 0)) or (
+            last.name == "speed" and last.args == (1,)
+        ):
+            normalized.pop()
+    return tuple(normalized)
+
+
+def probe_clip_state(video_path: str) -> ClipState:
+    """Look up the geometry needed to compile an edit list in the media index."""
+    info = media_index.get(video_path)
+    return ClipState(
+        width=info.width,
+        height=info.height,
+        duration=info.duration,
+        has_audio=info.has_audio,
+    )
+
+
+def atempo_chain(audio, factor: float):
+    """Chain atempo filters, each limited to the 0.5-2.0 range."""
+    while factor > 2.0:
+        audio = audio.filter("atempo", 2.0)
+        factor /= 2.0
+    while factor < 0.5:
+        audio = audio.filter("atempo", 0.5)
+        factor /= 0.5
+    return audio.filter("atempo", factor)
+
+
+class EditList:
+    """Ordered edits applied to an untouched source in one decode/encode pass."""
+
+    def __init__(self, source_path: str, source_state: ClipState = None):
+        self.source_path = source_path
+        self.source_state = source_state or probe_clip_state(source_path)
+        self.operations: list[EditOperation] = []
+        self.states: list[ClipState] = [self.source_state]
+
+    @property
+    def state(self) -> ClipState:
+        """State of the clip after every recorded edit."""
+        return self.states[-1]
+
+    def append(self, operation: EditOperation):
+        """Record an edit, raising ValueError if it cannot apply.
+
+        A jump cut without spans is resolved here against the audio of the
+        current state, so the recorded edit replays identically later. That
+        decodes the whole audio track, so interactive callers resolve it on a
+        worker with detect_jump_cut first.
+        """
+        if operation.name == "jump_cut" and not operation.args:
+            operation = self.detect_jump_cut()
+        self.states.append(self.state.apply(operation))
+        self.operations.append(operation)
+
+    def pop(self) -> EditOperation:
+        """Remove and return the most recent edit."""
+        self.states.pop()
+        return self.operations.pop()
+
+    def __len__(self) -> int:
+        return len(self.operations)
+
+    def with_source(self, source_path: str, source_state: ClipState = None) -> "EditList":
+        """Remap the recorded edits onto another rendition of the same source."""
+        edit_list = EditList(source_path, source_state)
+        for operation in self.operations:
+            edit_list.append(operation)
+        return edit_list
+
+    def detect_jump_cut(self, **detect_kwargs) -> EditOperation:
+        """Build a jump cut that drops the silent spans of the current state."""
+        _, audio = self.streams(with_video=False)
+        if audio is None:
+            raise ValueError("A jump cut needs an audio track.")
+        spans = detect_speech_spans(audio, **detect_kwargs)
+        if not spans:
+            raise ValueError("The clip is silent throughout.")
+        return EditOperation("jump_cut", tuple(time for span in spans for time in span))
+
+    def source_range(self) -> Optional[tuple[float, float]]:
+        """Return the source span kept by a trim-only edit list, or None."""
+        if not self.operations or any(op.name != "trim" for op in self.operations):
+            return None
+        start = sum(op.args[0] for op in self.operations)
+        return start, start + self.state.duration
+
+    def streams(self, with_video: bool = True):
+        """Build the video and audio filter chains for the whole edit list.
+
+        With with_video False only the audio chain is built, and video is None.
+        """
+        source = ffmpeg.input(self.source_path)
+        video = source.video if with_video else None
+        audio = source.audio if self.source_state.has_audio else None
+
+        for operation, state in zip(self.operations, self.states):
+            if operation.name == "trim":
+                start, end = operation.args
+                stop = state.duration - end
+                if video is not None:
+                    video = video.trim(start=start, end=stop).setpts("PTS-STARTPTS")
+                if audio is not None:
+                    audio = audio.filter("atrim", start=start, end=stop).filter(
+                        "asetpts", "PTS-STARTPTS"
+                    )
+
+            elif operation.name in ("crop", "zoom"):
+                result = state.apply(operation)
+                x_offset = (state.width - result.width) // 2
+                y_offset = (state.height - result.height) // 2
+                if video is not None:
+                    video = video.filter(
+                        "crop", w=result.width, h=result.height, x=x_offset, y=y_offset
+                    )
+
+            elif operation.name == "speed":
+                (factor,) = operation.args
+                if video is not None:
+                    video = video.filter("setpts", f"{1/factor}*PTS")
+                if audio is not None:
+                    audio = atempo_chain(audio, factor)
+
+            elif operation.name == "fade_in":
+                (duration,) = operation.args
+                if video is not None:
+                    video = video.filter("fade", t="in", d=duration)
+                if audio is not None:
+                    audio = audio.filter("afade", t="in", d=duration)
+
+            elif operation.name == "fade_out":
+                (duration,) = operation.args
+                fade_start = state.duration - duration
+                if video is not None:
+                    video = video.filter("fade", t="out", start_time=fade_start, d=duration)
+                if audio is not None:
+                    audio = audio.filter("afade", t="out", st=fade_start, d=duration)
+
+            elif operation.name == "jump_cut" and (video is not None or audio is not None):
+                video, audio = cut_streams(video, audio, span_pairs(operation.args))
+
+        return video, audio
+
+    def compile(self, output_path: str, **output_kwargs):
+        """Compile the edit list into a single ffmpeg command writing output_path."""
+        video, audio = self.streams()
+        streams = [video] if audio is None else [video, audio]
+        kwargs = {"vcodec": "libx264", "crf": 22}
+        if audio is not None:
+            kwargs["acodec"] = "aac"
+        kwargs.update(output_kwargs)
+        return ffmpeg.output(*streams, output_path, **kwargs).overwrite_output()
+
+    def render(self, output_path: str, smart_cut: bool = True, runner=None,
+               chunks: int = 1, **output_kwargs):
+        """Render the edit list to output_path in a single pass.
+
+        Trim-only edit lists are smart-cut when possible, copying whole GOPs and
+        re-encoding only the partial GOPs at each edge. With chunks > 1 other
+        edit lists are encoded as keyframe-aligned chunks in parallel. Every
+        ffmpeg command is passed to runner, or run quietly if none is given.
+        """
+        source_info = media_index.get(self.source_path)
+        span = self.source_range() if smart_cut else None
+        # Long jump cuts are split across chunks to keep each filter graph small.
+        spans = sum(len(op.args) // 2 for op in self.operations if op.name == "jump_cut")
+        chunks = max(chunks, math.ceil(spans / MAX_GRAPH_SPANS))
+        if span is not None and smart_trim(
+            self.source_path, *span, output_path, source_info, runner=runner
+        ):
+            codec, pix_fmt = source_info.codec, source_info.pix_fmt
+            time_base = source_info.time_base
+        else:
+            if chunks > 1:
+                render_chunked(self, output_path, chunks, runner=runner, **output_kwargs)
+            else:
+                (runner or run_quietly)(self.compile(output_path, **output_kwargs))
+            codec, pix_fmt = "h264", output_kwargs.get("pix_fmt", source_info.pix_fmt)
+            # The muxer picks the encoded time base, so leave it to a probe.
+            time_base = None
+
+        # The output geometry is known from the edit list, so skip re-probing it.
+        media_index.record(
+            output_path,
+            replace(
+                source_info,
+                width=self.state.width,
+                height=self.state.height,
+                duration=self.state.duration,
+                codec=codec,
+                pix_fmt=pix_fmt,
+                time_base=time_base,
+                keyframes=None,
+            ),
+        )
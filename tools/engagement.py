@@ -0,0 +1,195 @@
+"""Per-second engagement signals stored as memory-mapped columns with pyramids."""
+
+import os
+import tempfile
+
+import numpy as np
+
+ENGAGEMENT_DIR = os.path.join(tempfile.gettempdir(), "chopstickz-engagement")
+PYRAMID_FACTOR = 4
+PYRAMID_MIN_POINTS = 256
+SCORE_SIGNAL = "score"
+HIGHLIGHT_QUANTILE = 0.9
+HIGHLIGHT_MIN_SECONDS = 3
+HIGHLIGHT_MERGE_SECONDS = 2
+HIGHLIGHT_SMOOTH_SECONDS = 5
+# Fusion weights by signal name; unlisted signals get a weight of 1.
+SIGNAL_WEIGHTS = {
+    "audio_rms": 0.0,  # Redundant with loudness, kept for display.
+    "audio_loudness": 1.0,
+    "audio_flux": 0.5,
+    "audio_onsets": 0.5,
+    "motion": 1.0,
+}
+
+
+def _block_reduce(values: np.ndarray, fill: float, reducer) -> np.ndarray:
+    """Reduce consecutive blocks of PYRAMID_FACTOR values, padding the last block."""
+    padding = (-len(values)) % PYRAMID_FACTOR
+    if padding:
+        values = np.concatenate([values, np.full(padding, fill, dtype=values.dtype)])
+    return reducer(values.reshape(-1, PYRAMID_FACTOR), axis=1)
+
+
+def build_pyramid(values: np.ndarray) -> list[np.ndarray]:
+    """Return levels of (min, max, mean) rows, each PYRAMID_FACTOR times coarser.
+
+    Level 0 is the per-second column itself. Means are weighted by how many
+    seconds each block covers, so a short trailing block is not over-counted.
+    """
+    values = np.asarray(values, dtype=np.float32)
+    levels = [values]
+    mins = maxs = means = values.astype(np.float64)
+    counts = np.ones(len(values))
+    while len(mins) > PYRAMID_MIN_POINTS:
+        block_counts = _block_reduce(counts, 0, np.sum)
+        means = _block_reduce(means * counts, 0, np.sum) / block_counts
+        mins = _block_reduce(mins, np.inf, np.min)
+        maxs = _block_reduce(maxs, -np.inf, np.max)
+        counts = block_counts
+        levels.append(np.stack([mins, maxs, means], axis=1).astype(np.float32))
+    return levels
+
+
+def normalize(values: np.ndarray) -> np.ndarray:
+    """Scale a signal to [0, 1] between its 1st and 99th percentiles."""
+    values = np.asarray(values, dtype=np.float64)
+    if not len(values):
+        return values
+    low, high = np.percentile(values, [1, 99])
+    if high <= low:
+        return np.zeros_like(values)
+    return np.clip((values - low) / (high - low), 0.0, 1.0)
+
+
+def find_spans(mask: np.ndarray, merge_seconds: int = HIGHLIGHT_MERGE_SECONDS,
+               min_seconds: int = HIGHLIGHT_MIN_SECONDS) -> list[tuple[int, int]]:
+    """Turn a per-second boolean mask into merged (start, end) second spans."""
+    edges = np.diff(np.concatenate([[0], mask.astype(np.int8), [0]]))
+    starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    spans = []
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        if spans and start - spans[-1][1] <= merge_seconds:
+            spans[-1] = (spans[-1][0], end)
+        else:
+            spans.append((start, end))
+    return [(start, end) for start, end in spans if end - start >= min_seconds]
+
+
+class EngagementStore:
+    """Engagement signals of each video, one float32 column per signal.
+
+    Videos are keyed by content hash. Every column is saved with min/max/mean
+    pyramid levels and read back memory-mapped, so a zoomed-out view of a long
+    stream only touches a few kilobytes of a coarse level.
+    """
+
+    def __init__(self, store_dir: str = ENGAGEMENT_DIR):
+        self.store_dir = store_dir
+
+    def _level_path(self, digest: str, signal: str, level: int) -> str:
+        return os.path.join(self.store_dir, digest, f"{signal}.{level}.npy")
+
+    def signals(self, digest: str) -> list[str]:
+        """Return the names of the signals stored for a video."""
+        video_dir = os.path.join(self.store_dir, digest)
+        if not os.path.isdir(video_dir):
+            return []
+        return sorted(
+            name[: -len(".0.npy")] for name in os.listdir(video_dir) if name.endswith(".0.npy")
+        )
+
+    def write(self, digest: str, signal: str, values: np.ndarray):
+        """Store a per-second signal and its pyramid, replacing any previous version."""
+        os.makedirs(os.path.join(self.store_dir, digest), exist_ok=True)
+        for level, data in enumerate(build_pyramid(values)):
+            path = self._level_path(digest, signal, level)
+            partial_path = f"{path}.{os.getpid()}.tmp.npy"
+            np.save(partial_path, data)
+            os.replace(partial_path, path)
+        # Drop coarser levels left over from a longer previous version.
+        level += 1
+        while os.path.exists(self._level_path(digest, signal, level)):
+            os.remove(self._level_path(digest, signal, level))
+            level += 1
+
+    def column(self, digest: str, signal: str, level: int = 0) -> np.ndarray:
+        """Memory-map one pyramid level of a signal.
+
+        Level 0 is one value per second; coarser levels hold (min, max, mean) rows.
+        """
+        return np.load(self._level_path(digest, signal, level), mmap_mode="r")
+
+    def read(self, digest: str, signal: str, start: float = 0, end: float = None,
+             max_points: int = 1000) -> tuple[int, np.ndarray]:
+        """Return (seconds per point, (min, max, mean) rows) covering start..end.
+
+        The finest level that fits in max_points is used, so the read size is
+        bounded by max_points regardless of the stream's length.
+        """
+        seconds = len(self.column(digest, signal))
+        end = seconds if end is None else min(end, seconds)
+        level = 0
+        while (end - start) / PYRAMID_FACTOR**level > max_points and os.path.exists(
+            self._level_path(digest, signal, level + 1)
+        ):
+            level += 1
+        step = PYRAMID_FACTOR**level
+        first, last = int(start // step), -(-int(end) // step)
+        data = np.asarray(self.column(digest, signal, level)[first:last])
+        if level == 0:
+            data = np.repeat(data[:, None], 3, axis=1)
+        return step, data
+
+    def write_events(self, digest: str, name: str, times: list[float]):
+        """Store a sorted list of event times, such as shot boundaries."""
+        path = os.path.join(self.store_dir, digest, f"{name}.events.npy")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        partial_path = f"{path}.{os.getpid()}.tmp.npy"
+        np.save(partial_path, np.sort(np.asarray(times, dtype=np.float64)))
+        os.replace(partial_path, path)
+
+    def events(self, digest: str, name: str) -> list[float]:
+        """Return stored event times, or an empty list if none were recorded."""
+        path = os.path.join(self.store_dir, digest, f"{name}.events.npy")
+        if not os.path.exists(path):
+            return []
+        return np.load(path).tolist()
+
+    def fuse(self, digest: str, weights: dict[str, float] = None) -> np.ndarray:
+        """Combine every stored signal into a normalized score and store it.
+
+        Each signal is normalized to [0, 1] before the weighted average, so
+        signals with different units contribute on the same scale.
+        """
+        names = [name for name in self.signals(digest) if name != SCORE_SIGNAL]
+        weights = weights or SIGNAL_WEIGHTS
+        columns = [(self.column(digest, name), weights.get(name, 1.0)) for name in names]
+        columns = [(values, weight) for values, weight in columns if weight > 0]
+        if not columns:
+            return np.zeros(0, dtype=np.float32)
+
+        seconds = max(len(values) for values, _ in columns)
+        score = np.zeros(seconds)
+        for values, weight in columns:
+            score[: len(values)] += weight * normalize(values)
+        score /= sum(weight for _, weight in columns)
+        self.write(digest, SCORE_SIGNAL, score)
+        return score.astype(np.float32)
+
+    def highlights(self, digest: str, quantile: float = HIGHLIGHT_QUANTILE,
+                   min_seconds: int = HIGHLIGHT_MIN_SECONDS) -> list[tuple[int, int]]:
+        """Return (start, end) second spans where the fused score is unusually high."""
+        if SCORE_SIGNAL not in self.signals(digest):
+            return []
+        score = np.asarray(self.column(digest, SCORE_SIGNAL), dtype=np.float64)
+        if not len(score) or score.max() <= 0:
+            return []
+        # Smooth first so a single noisy second does not open or split a span.
+        kernel = np.ones(HIGHLIGHT_SMOOTH_SECONDS) / HIGHLIGHT_SMOOTH_SECONDS
+        score = np.convolve(score, kernel, mode="same")
+        threshold = max(np.quantile(score, quantile), 1e-6)
+        return find_spans(score >= threshold, min_seconds=min_seconds)
+
+
+engagement_store = EngagementStore()
@@ -0,0 +1,97 @@
+"""Random access to decoded frames via a keyframe index and an LRU frame cache."""
+
+import bisect
+from collections import OrderedDict
+
+import cv2
+
+from tools.media_info import media_index
+from tools.playback import DISPLAY_SIZE, fit_size
+
+DEFAULT_CACHE_BYTES = 256 * 1024 * 1024
+
+
+class FrameCache:
+    """Decoded frames keyed by frame index, evicted least recently used first."""
+
+    def __init__(self, budget_bytes: int = DEFAULT_CACHE_BYTES):
+        self.budget_bytes = budget_bytes
+        self.size_bytes = 0
+        self.frames: OrderedDict = OrderedDict()
+
+    def get(self, index: int):
+        """Return a cached frame and mark it recently used, or None."""
+        frame = self.frames.get(index)
+        if frame is not None:
+            self.frames.move_to_end(index)
+        return frame
+
+    def put(self, index: int, frame):
+        """Cache a frame, evicting old ones to stay within the byte budget."""
+        if index in self.frames:
+            self.size_bytes -= self.frames.pop(index).nbytes
+        self.frames[index] = frame
+        self.size_bytes += frame.nbytes
+        while self.size_bytes > self.budget_bytes and len(self.frames) > 1:
+            _, evicted = self.frames.popitem(last=False)
+            self.size_bytes -= evicted.nbytes
+
+    def __contains__(self, index: int) -> bool:
+        return index in self.frames
+
+
+class FrameSeeker:
+    """Decode any frame by seeking to the preceding keyframe and reading forward.
+
+    Every frame decoded on the way is cached, so scrubbing within a GOP and
+    single-frame stepping are served from memory.
+    """
+
+    def __init__(self, video_path: str, bounds: tuple[int, int] = DISPLAY_SIZE,
+                 cache_bytes: int = DEFAULT_CACHE_BYTES):
+        info = media_index.get(video_path, keyframes=True)
+        self.video_path = video_path
+        self.fps = info.fps or 30
+        self.frame_count = max(1, int(info.duration * self.fps))
+        self.size = fit_size(info.width, info.height, bounds)
+        self.keyframe_indices = sorted({round(t * self.fps) for t in info.keyframes} | {0})
+        self.cache = FrameCache(cache_bytes)
+        self.cap = cv2.VideoCapture(video_path)
+        self.next_index = 0
+
+    def index_at(self, seconds: float) -> int:
+        """Clamp a timestamp to a valid frame index."""
+        return min(max(int(round(seconds * self.fps)), 0), self.frame_count - 1)
+
+    def frame(self, index: int):
+        """Return the RGB frame at index at display size, or None past the end."""
+        index = min(max(index, 0), self.frame_count - 1)
+        cached = self.cache.get(index)
+        if cached is not None:
+            return cached
+
+        keyframe = self.keyframe_indices[bisect.bisect_right(self.keyframe_indices, index) - 1]
+        # Reading on from the current position beats seeking if it is in range.
+        if not keyframe <= self.next_index <= index:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, keyframe)
+            self.next_index = keyframe
+
+        frame = None
+        while self.next_index <= index:
+            ret, decoded = self.cap.read()
+            if not ret:
+                self.frame_count = self.next_index
+                break
+            decoded = cv2.resize(decoded, self.size, interpolation=cv2.INTER_AREA)
+            frame = cv2.cvtColor(decoded, cv2.COLOR_BGR2RGB)
+            self.cache.put(self.next_index, frame)
+            self.next_index += 1
+        return frame
+
+    def frame_at(self, seconds: float):
+        """Return the frame displayed at a timestamp."""
+        return self.frame(self.index_at(seconds))
+
+    def release(self):
+        """Close the underlying capture."""
+        self.cap.release()
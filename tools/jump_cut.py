@@ -0,0 +1,128 @@
+"""Silence detection for jump cuts that keep only the non-silent parts of a clip."""
+
+import os
+import tempfile
+
+import ffmpeg
+import numpy as np
+
+from tools.audio_analysis import ANALYSIS_RATE, PCM_DIR, extract_pcm, frame_power
+
+WINDOW_SECONDS = 0.02
+SILENCE_THRESHOLD_DB = -40.0
+PADDING_SECONDS = 0.15
+MIN_SILENCE_SECONDS = 0.6
+# Spans are split out of the stream in groups of this many, so each frame
+# passes through one trim per group and one per span of its own group.
+JUMP_CUT_GROUP_SPANS = 32
+# Edit lists keeping more spans than this are rendered in chunks, so each
+# filter graph stays quick to build and far below Linux's 128 KiB limit on
+# a single command-line argument.
+MAX_GRAPH_SPANS = 200
+
+
+def span_pairs(args: tuple[float, ...]) -> list[tuple[float, float]]:
+    """Unflatten jump-cut arguments into (start, end) spans."""
+    return list(zip(args[::2], args[1::2]))
+
+
+def cut_streams(video, audio, spans: list[tuple[float, float]]):
+    """Keep only the spans of video and audio, joined back to back with one concat.
+
+    Either stream may be None. Video and audio are trimmed at the same
+    timestamps, and concat starts every segment where the longer stream of
+    the previous one ended, so they stay in sync however many cuts there are.
+    """
+    streams = []
+    if video is not None:
+        streams.append(("split", "trim", "setpts", video))
+    if audio is not None:
+        streams.append(("asplit", "atrim", "asetpts", audio))
+    groups = [
+        spans[index: index + JUMP_CUT_GROUP_SPANS]
+        for index in range(0, len(spans), JUMP_CUT_GROUP_SPANS)
+    ]
+
+    # Per stream, the segment of every span, in span order.
+    segments = []
+    for split, trim, setpts, stream in streams:
+        group_streams = stream.filter(setpts, "PTS-STARTPTS").filter_multi_output(
+            split, len(groups)
+        )
+        stream_segments = []
+        for index, group in enumerate(groups):
+            # Group trims keep their input timestamps, so span bounds stay absolute.
+            span_streams = (
+                group_streams[index]
+                .filter(trim, start=group[0][0], end=group[-1][1])
+                .filter_multi_output(split, len(group))
+            )
+            stream_segments.extend(
+                span_streams[span_index]
+                .filter(trim, start=start, end=end)
+                .filter(setpts, "PTS-STARTPTS")
+                for span_index, (start, end) in enumerate(group)
+            )
+        segments.append(stream_segments)
+
+    joined = ffmpeg.concat(
+        *(segment for span in zip(*segments) for segment in span),
+        v=int(video is not None),
+        a=int(audio is not None),
+    ).node
+    # Concat's outputs follow its v and a counts, so audio is always the last.
+    return (
+        joined[0] if video is not None else None,
+        joined[len(streams) - 1] if audio is not None else None,
+    )
+
+
+def kept_before(spans: list[tuple[float, float]], time: float) -> float:
+    """Map a time before the jump cut to the time it lands on after it."""
+    return sum(min(end, time) - start for start, end in spans if start < time)
+
+
+def speech_spans(energy_db: np.ndarray, duration: float,
+                 threshold_db: float = SILENCE_THRESHOLD_DB, padding: float = PADDING_SECONDS,
+                 min_silence: float = MIN_SILENCE_SECONDS) -> list[tuple[float, float]]:
+    """Return the (start, end) spans to keep given the energy of each WINDOW_SECONDS window.
+
+    Each loud run is widened by padding, and silences shorter than
+    min_silence are kept so speech is not chopped between words.
+    """
+    edges = np.diff(np.concatenate([[0], (energy_db > threshold_db).astype(np.int8), [0]]))
+    starts = np.maximum(np.flatnonzero(edges == 1) * WINDOW_SECONDS - padding, 0.0)
+    ends = np.minimum(np.flatnonzero(edges == -1) * WINDOW_SECONDS + padding, duration)
+    if not len(starts):
+        return []
+
+    # Merge runs whose silence gap is too short to be worth cutting.
+    breaks = starts[1:] - ends[:-1] >= min_silence
+    starts = starts[np.concatenate([[True], breaks])]
+    ends = ends[np.concatenate([breaks, [True]])]
+    return [(round(start, 3), round(end, 3)) for start, end in zip(starts.tolist(), ends.tolist())]
+
+
+def detect_speech_spans(audio, threshold_db: float = SILENCE_THRESHOLD_DB,
+                        padding: float = PADDING_SECONDS,
+                        min_silence: float = MIN_SILENCE_SECONDS) -> list[tuple[float, float]]:
+    """Decode an ffmpeg audio stream to PCM on disk and return the spans worth keeping.
+
+    The PCM is memory-mapped and measured a chunk at a time, as in the
+    engagement analysis, so memory use does not grow with the clip length.
+    Raises ValueError if the audio cannot be decoded.
+    """
+    os.makedirs(PCM_DIR, exist_ok=True)
+    handle, pcm_path = tempfile.mkstemp(prefix="jump-cut-", suffix=".pcm", dir=PCM_DIR)
+    os.close(handle)
+    try:
+        pcm = extract_pcm(audio, pcm_path)
+        power = frame_power(pcm, int(ANALYSIS_RATE * WINDOW_SECONDS))
+        duration = len(pcm) / ANALYSIS_RATE
+    except ffmpeg.Error as e:
+        stderr = e.stderr.decode() if e.stderr else "Unknown FFmpeg error"
+        raise ValueError(f"Failed to read the audio for a jump cut: {stderr}") from None
+    finally:
+        os.remove(pcm_path)
+    energy_db = 10 * np.log10(power + 1e-10)
+    return speech_spans(energy_db, duration, threshold_db, padding, min_silence)
@@ -0,0 +1,168 @@
+"""Persistent index of probed media metadata, keyed by path, size and mtime."""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from dataclasses import asdict, dataclass, replace
+from typing import Optional
+
+import ffmpeg
+
+from tools.render_cache import content_hash
+
+INDEX_DIR = os.path.join(tempfile.gettempdir(), "chopstickz-media-index")
+
+
+def _write_atomic(path: str, text: str):
+    """Write text so concurrent readers never see a partial file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(partial_path, "w") as partial_file:
+        partial_file.write(text)
+    os.replace(partial_path, path)
+
+
+@dataclass(frozen=True)
+class MediaInfo:
+    """Stream metadata needed by the editor, recorded once per file."""
+
+    width: int
+    height: int
+    duration: float
+    fps: float
+    codec: str
+    pix_fmt: str = "yuv420p"
+    time_base: Optional[str] = "1/90000"
+    has_audio: bool = True
+    keyframes: Optional[tuple[float, ...]] = None
+
+    @property
+    def gop_seconds(self) -> float:
+        """Longest keyframe interval, or the whole duration if unknown."""
+        if not self.keyframes or len(self.keyframes) < 2:
+            return self.duration
+        bounds = list(self.keyframes) + [self.duration]
+        return max(b - a for a, b in zip(bounds, bounds[1:]))
+
+
+def _parse_rate(rate: str) -> float:
+    """Convert an ffprobe rational such as '30000/1001' to a float."""
+    numerator, _, denominator = rate.partition("/")
+    denominator = float(denominator or 1)
+    return float(numerator) / denominator if denominator else 0.0
+
+
+def probe_media_info(video_path: str) -> MediaInfo:
+    """Read stream and format metadata with a single ffprobe call."""
+    probe = ffmpeg.probe(video_path)
+    video_stream = next(s for s in probe["streams"] if s["codec_type"] == "video")
+    return MediaInfo(
+        width=int(video_stream["width"]),
+        height=int(video_stream["height"]),
+        duration=float(probe["format"]["duration"]),
+        fps=_parse_rate(video_stream.get("avg_frame_rate", "0/0"))
+        or _parse_rate(video_stream.get("r_frame_rate", "30/1")),
+        codec=video_stream.get("codec_name", ""),
+        pix_fmt=video_stream.get("pix_fmt", "yuv420p"),
+        time_base=video_stream.get("time_base", "1/90000"),
+        has_audio=any(s["codec_type"] == "audio" for s in probe["streams"]),
+    )
+
+
+def keyframe_times(video_path: str) -> list[float]:
+    """Return the times of every video keyframe, in seconds from the start of the stream.
+
+    Packet timestamps include the stream's start_time, which is subtracted so
+    the times line up with the seek and trim offsets used everywhere else.
+    """
+    probe = ffmpeg.probe(
+        video_path,
+        select_streams="v:0",
+        show_entries="packet=pts_time,flags:stream=start_time",
+    )
+    streams = probe.get("streams") or [{}]
+    start_time = streams[0].get("start_time", "0")
+    offset = float(start_time) if start_time not in (None, "N/A") else 0.0
+    return sorted(
+        float(packet["pts_time"]) - offset
+        for packet in probe.get("packets", [])
+        if "K" in packet.get("flags", "") and packet.get("pts_time") not in (None, "N/A")
+    )
+
+
+class MediaIndex:
+    """Probe each file once and persist the results by path, size and mtime.
+
+    Looking a file up never reads its content; digest() hashes it only for
+    callers that need content identity, such as cache keys.
+    """
+
+    def __init__(self, index_dir: str = INDEX_DIR):
+        self.index_dir = index_dir
+        self.entries: dict[str, MediaInfo] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def file_key(video_path: str) -> str:
+        """Identify a file by path, size and mtime, from a stat call alone."""
+        stat = os.stat(video_path)
+        key = f"{os.path.abspath(video_path)}:{stat.st_size}:{stat.st_mtime_ns}"
+        return hashlib.sha1(key.encode()).hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.index_dir, f"{key}.json")
+
+    def digest(self, video_path: str) -> str:
+        """Return the content hash of video_path, reusing a stored alias if any."""
+        alias_path = os.path.join(self.index_dir, f"alias-{self.file_key(video_path)}")
+        if os.path.exists(alias_path):
+            with open(alias_path) as alias_file:
+                return alias_file.read().strip()
+        digest = content_hash(video_path)
+        _write_atomic(alias_path, digest)
+        return digest
+
+    def _load(self, key: str) -> Optional[MediaInfo]:
+        with self._lock:
+            if key in self.entries:
+                return self.entries[key]
+            entry_path = self._entry_path(key)
+            if not os.path.exists(entry_path):
+                return None
+            with open(entry_path) as entry_file:
+                data = json.load(entry_file)
+            if data.get("keyframes") is not None:
+                data["keyframes"] = tuple(data["keyframes"])
+            self.entries[key] = MediaInfo(**data)
+            return self.entries[key]
+
+    def _store(self, key: str, info: MediaInfo):
+        with self._lock:
+            self.entries[key] = info
+            _write_atomic(self._entry_path(key), json.dumps(asdict(info)))
+
+    def get(self, video_path: str, keyframes: bool = False) -> MediaInfo:
+        """Return metadata for video_path, probing only on the first request.
+
+        Keyframe timestamps require scanning every packet, so they are only
+        collected when asked for and then kept with the rest of the entry.
+        """
+        key = self.file_key(video_path)
+        info = self._load(key)
+        # Recorded entries leave out the time base, which only a probe knows.
+        if info is None or (keyframes and info.time_base is None):
+            info = probe_media_info(video_path)
+            self._store(key, info)
+        if keyframes and info.keyframes is None:
+            info = replace(info, keyframes=tuple(keyframe_times(video_path)))
+            self._store(key, info)
+        return info
+
+    def record(self, video_path: str, info: MediaInfo):
+        """Record metadata derived without probing, e.g. for a rendered edit."""
+        self._store(self.file_key(video_path), info)
+
+
+media_index = MediaIndex()
@@ -0,0 +1,202 @@
+"""Threaded playback engine with a bounded frame ring and wall-clock presentation."""
+
+import threading
+import time
+from collections import deque
+
+import cv2
+import ffmpeg
+import numpy as np
+
+DEFAULT_RING_FRAMES = 8
+DISPLAY_SIZE = (640, 480)
+
+
+class FrameRing:
+    """Bounded, thread-safe FIFO of decoded frames and their presentation times."""
+
+    def __init__(self, capacity: int = DEFAULT_RING_FRAMES):
+        self.capacity = capacity
+        self.frames: deque = deque()
+        self.closed = False
+        self.condition = threading.Condition()
+
+    def put(self, pts: float, frame) -> bool:
+        """Block until there is room for a frame; return False once closed."""
+        with self.condition:
+            while len(self.frames) >= self.capacity and not self.closed:
+                self.condition.wait()
+            if self.closed:
+                return False
+            self.frames.append((pts, frame))
+            self.condition.notify_all()
+            return True
+
+    def get(self, timeout: float = None):
+        """Pop the oldest frame, or return None if closed or timed out."""
+        with self.condition:
+            if not self.frames and not self.closed:
+                self.condition.wait(timeout)
+            if not self.frames:
+                return None
+            item = self.frames.popleft()
+            self.condition.notify_all()
+            return item
+
+    def __len__(self) -> int:
+        with self.condition:
+            return len(self.frames)
+
+    def close(self):
+        """Wake every waiter and stop accepting frames."""
+        with self.condition:
+            self.closed = True
+            self.frames.clear()
+            self.condition.notify_all()
+
+
+def fit_size(width: int, height: int, bounds: tuple[int, int] = DISPLAY_SIZE) -> tuple[int, int]:
+    """Scale width x height to fit inside bounds, keeping the aspect ratio."""
+    scale = min(bounds[0] / width, bounds[1] / height)
+    return max(1, int(width * scale)), max(1, int(height * scale))
+
+
+class DecodeThread(threading.Thread):
+    """Producer that decodes, converts and downsizes frames ahead of display.
+
+    At end of file it seeks back to the first frame instead of reopening the
+    capture, offsetting timestamps so the presentation clock keeps running.
+    """
+
+    def __init__(self, video_path: str, ring: FrameRing, duration: float,
+                 bounds: tuple[int, int] = DISPLAY_SIZE):
+        super().__init__(daemon=True)
+        self.video_path = video_path
+        self.ring = ring
+        self.duration = duration
+        self.bounds = bounds
+
+    def run(self):
+        cap = cv2.VideoCapture(self.video_path)
+        loop_offset = 0.0
+        size = None
+        try:
+            while not self.ring.closed:
+                ret, frame = cap.read()
+                if not ret:
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    loop_offset += self.duration
+                    ret, frame = cap.read()
+                    if not ret:
+                        break
+
+                pts = loop_offset + cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+                if size is None:
+                    size = fit_size(frame.shape[1], frame.shape[0], self.bounds)
+                frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                if not self.ring.put(pts, frame):
+                    break
+        finally:
+            cap.release()
+
+
+class PipeDecodeThread(threading.Thread):
+    """Producer that has ffmpeg decode, scale and convert to RGB in one step.
+
+    Raw frames are read from the pipe straight into a pool of preallocated
+    arrays, so frames arrive at display size with no per-frame allocation.
+    The pool holds a few more buffers than the ring so the frame a consumer
+    has just taken is not overwritten while it copies it; consumers must
+    not keep a reference to a frame past that.
+    """
+
+    def __init__(self, video_path: str, ring: FrameRing, fps: float, size: tuple[int, int]):
+        super().__init__(daemon=True)
+        self.video_path = video_path
+        self.ring = ring
+        self.fps = fps
+        self.size = size
+        width, height = size
+        self.buffers = [
+            np.empty((height, width, 3), dtype=np.uint8)
+            for _ in range(ring.capacity + 4)
+        ]
+
+    def run(self):
+        width, height = self.size
+        process = (
+            ffmpeg.input(self.video_path, stream_loop=-1)
+            .output(
+                "pipe:",
+                format="rawvideo",
+                pix_fmt="rgb24",
+                vf=f"scale={width}:{height}:flags=bilinear",
+                an=None,
+            )
+            .run_async(pipe_stdout=True, quiet=True)
+        )
+        frame_index = 0
+        try:
+            while not self.ring.closed:
+                frame = self.buffers[frame_index % len(self.buffers)]
+                view = memoryview(frame).cast("B")
+                filled = 0
+                while filled < len(view):
+                    count = process.stdout.readinto(view[filled:])
+                    if not count:
+                        return
+                    filled += count
+                if not self.ring.put(frame_index / self.fps, frame):
+                    return
+                frame_index += 1
+        finally:
+            process.kill()
+            process.wait()
+
+
+class PlaybackEngine:
+    """Schedule decoded frames against wall time, dropping those that arrive late."""
+
+    def __init__(self, video_path: str, fps: float, duration: float,
+                 size: tuple[int, int] = None, ring_frames: int = DEFAULT_RING_FRAMES):
+        """Decode through an ffmpeg pipe at size if given, else through OpenCV."""
+        fps = fps if fps > 0 else 30
+        self.frame_interval = 1 / fps
+        self.ring = FrameRing(ring_frames)
+        if size is not None:
+            self.decoder = PipeDecodeThread(video_path, self.ring, fps, size)
+        else:
+            self.decoder = DecodeThread(video_path, self.ring, duration)
+        self.dropped_frames = 0
+
+    def frames(self, is_running):
+        """Yield RGB frames at their presentation time while is_running() holds."""
+        self.decoder.start()
+        clock_start = None
+        try:
+            while is_running():
+                item = self.ring.get(timeout=0.1)
+                if item is None:
+                    continue
+                pts, frame = item
+                now = time.monotonic()
+                if clock_start is None:
+                    clock_start = now - pts
+                delay = clock_start + pts - now
+
+                # Behind by more than a frame with newer frames waiting: skip it.
+                if delay < -self.frame_interval and len(self.ring) > 0:
+                    self.dropped_frames += 1
+                    continue
+                if delay > 0:
+                    time.sleep(delay)
+                yield frame
+        finally:
+            self.stop()
+
+    def stop(self):
+        """Stop the decode thread and release the capture."""
+        self.ring.close()
+        if self.decoder.is_alive():
+            self.decoder.join()
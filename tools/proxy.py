@@ -0,0 +1,48 @@
+"""Low-resolution editing proxies for interactive work on large sources."""
+
+import hashlib
+import os
+import tempfile
+
+import ffmpeg
+
+PROXY_DIR = os.path.join(tempfile.gettempdir(), "chopstickz-proxies")
+PROXY_HEIGHT = 360
+# Short GOPs keep seeks and frame-accurate trims cheap on the proxy.
+PROXY_GOP = 15
+
+
+def proxy_path_for(source_path: str) -> str:
+    """Return the stable proxy location for a source file."""
+    stat = os.stat(source_path)
+    key = f"{os.path.abspath(source_path)}:{stat.st_size}:{stat.st_mtime_ns}"
+    digest = hashlib.sha1(key.encode()).hexdigest()
+    return os.path.join(PROXY_DIR, f"{digest}.mp4")
+
+
+def build_proxy(source_path: str, height: int = PROXY_HEIGHT) -> str:
+    """Transcode a small, short-GOP proxy of source_path, reusing an existing one."""
+    proxy_path = proxy_path_for(source_path)
+    if os.path.exists(proxy_path):
+        return proxy_path
+
+    os.makedirs(PROXY_DIR, exist_ok=True)
+    partial_path = proxy_path + ".part.mp4"
+    (
+        ffmpeg.input(source_path)
+        .output(
+            partial_path,
+            vf=f"scale=-2:{height}",
+            vcodec="libx264",
+            preset="ultrafast",
+            tune="fastdecode",
+            crf=26,
+            g=PROXY_GOP,
+            acodec="aac",
+            audio_bitrate="96k",
+        )
+        .overwrite_output()
+        .run(quiet=True)
+    )
+    os.replace(partial_path, proxy_path)
+    return proxy_path
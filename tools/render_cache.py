@@ -0,0 +1,113 @@
+"""Content-addressed disk cache of rendered edit states with LRU eviction."""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from collections import OrderedDict
+
+CACHE_DIR = os.path.join(tempfile.gettempdir(), "chopstickz-renders")
+DEFAULT_BUDGET_BYTES = 5 * 1024**3
+HASH_CHUNK_BYTES = 4 * 1024 * 1024
+
+_content_hashes: dict[tuple[str, int, int], str] = {}
+
+
+def content_hash(path: str) -> str:
+    """Return the SHA-256 of a file, memoized by path, size and mtime."""
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if memo_key not in _content_hashes:
+        digest = hashlib.sha256()
+        with open(path, "rb") as file_object:
+            while chunk := file_object.read(HASH_CHUNK_BYTES):
+                digest.update(chunk)
+        _content_hashes[memo_key] = digest.hexdigest()
+    return _content_hashes[memo_key]
+
+
+class RenderCache:
+    """Rendered outputs keyed by source hash, operation chain and render profile.
+
+    Least recently used entries are evicted once the cache exceeds its byte
+    budget. Pinned entries, such as states reachable through undo, are never
+    evicted.
+    """
+
+    def __init__(self, cache_dir: str = CACHE_DIR, budget_bytes: int = DEFAULT_BUDGET_BYTES):
+        self.cache_dir = cache_dir
+        self.budget_bytes = budget_bytes
+        self.pinned: set[str] = set()
+        self.entries: OrderedDict[str, int] = OrderedDict()
+        os.makedirs(cache_dir, exist_ok=True)
+
+        # Rebuild LRU order from modification times, which get() refreshes.
+        existing = []
+        for name in os.listdir(cache_dir):
+            if name.endswith(".mp4"):
+                stat = os.stat(os.path.join(cache_dir, name))
+                existing.append((stat.st_mtime, name[: -len(".mp4")], stat.st_size))
+        for _, key, size in sorted(existing):
+            self.entries[key] = size
+
+    @staticmethod
+    def key(source_hash: str, operations, profile: dict = None) -> str:
+        """Build a cache key from a source identity, operation chain and output settings.
+
+        source_hash may be a content hash or any other stable identity of the
+        source, such as MediaIndex.file_key.
+        """
+        payload = {
+            "source": source_hash,
+            "operations": [[op.name, [round(arg, 6) for arg in op.args]] for op in operations],
+            "profile": profile or {},
+        }
+        encoded = json.dumps(payload, sort_keys=True).encode()
+        return hashlib.sha256(encoded).hexdigest()
+
+    @property
+    def size_bytes(self) -> int:
+        """Total size of every cached render."""
+        return sum(self.entries.values())
+
+    def path_for(self, key: str) -> str:
+        """Return the on-disk location of a cache entry."""
+        return os.path.join(self.cache_dir, f"{key}.mp4")
+
+    def get(self, key: str) -> str:
+        """Return the cached render for key and mark it recently used, or None."""
+        path = self.path_for(key)
+        if key not in self.entries or not os.path.exists(path):
+            self.entries.pop(key, None)
+            return None
+        self.entries.move_to_end(key)
+        os.utime(path)
+        return path
+
+    def put(self, key: str, rendered_path: str) -> str:
+        """Move a freshly rendered file into the cache and return its cached path."""
+        path = self.path_for(key)
+        shutil.move(rendered_path, path)
+        self.entries[key] = os.path.getsize(path)
+        self.entries.move_to_end(key)
+        self.evict(keep=key)
+        return path
+
+    def pin(self, keys):
+        """Replace the set of entries protected from eviction."""
+        self.pinned = set(keys)
+
+    def evict(self, keep: str = None):
+        """Drop least recently used, unpinned entries until within budget."""
+        total = self.size_bytes
+        for key in list(self.entries):
+            if total <= self.budget_bytes:
+                break
+            if key in self.pinned or key == keep:
+                continue
+            total -= self.entries.pop(key)
+            try:
+                os.remove(self.path_for(key))
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,164 @@
+"""Background render jobs with ffmpeg progress reporting and cancellation."""
+
+import itertools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import ffmpeg
+
+from tools.edit_list import EditList
+
+
+class RenderCancelled(Exception):
+    """Raised inside a worker when its job is cancelled mid-render."""
+
+
+class RenderJob:
+    """A snapshot of an edit list queued for rendering to output_path."""
+
+    def __init__(self, job_id: int, edit_list: EditList, output_path: str,
+                 smart_cut: bool = True, output_kwargs: dict = None, tag=None):
+        self.job_id = job_id
+        self.edit_list = edit_list
+        self.output_path = output_path
+        self.smart_cut = smart_cut
+        self.output_kwargs = output_kwargs or {}
+        self.tag = tag
+        self.state = "queued"
+        self.progress = 0.0
+        self.error = ""
+        # A render may run several ffmpeg processes, e.g. one per chunk.
+        self.processes = set()
+        self.cancelled = threading.Event()
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        """Stop the job, killing its ffmpeg processes if any are already running."""
+        self.cancelled.set()
+        with self._lock:
+            for process in self.processes:
+                process.kill()
+
+    def add_progress(self, amount: float):
+        """Add to the job's progress from any of its worker threads."""
+        with self._lock:
+            self.progress = min(1.0, self.progress + amount)
+
+
+def run_with_progress(command, duration: float, job: RenderJob, on_progress=None,
+                      share: float = 1.0):
+    """Run a compiled ffmpeg command, parsing -progress output into job.progress.
+
+    The command's own progress through duration seconds of output counts
+    for share of the whole job, so steps of one render add up to 1.
+    """
+    process = command.global_args(
+        "-progress", "pipe:1", "-nostats", "-loglevel", "error"
+    ).run_async(pipe_stdout=True, pipe_stderr=True)
+    with job._lock:
+        job.processes.add(process)
+    if job.cancelled.is_set():
+        process.kill()
+
+    reported = 0.0
+    for line in process.stdout:
+        key, _, value = line.decode().strip().partition("=")
+        # out_time_ms is reported in microseconds too, on older ffmpeg builds.
+        if key in ("out_time_us", "out_time_ms") and value.isdigit() and duration > 0:
+            fraction = min(1.0, int(value) / 1e6 / duration)
+            job.add_progress(share * (fraction - reported))
+            reported = fraction
+            if on_progress is not None:
+                on_progress(job)
+
+    stderr = process.stderr.read()
+    returncode = process.wait()
+    with job._lock:
+        job.processes.discard(process)
+    job.add_progress(share * (1.0 - reported))
+    if job.cancelled.is_set():
+        raise RenderCancelled()
+    if returncode:
+        raise ffmpeg.Error("ffmpeg", None, stderr)
+
+
+class RenderQueue:
+    """Run render jobs on a worker pool sized to the machine's cores.
+
+    Each worker supervises one ffmpeg child process. Callbacks are invoked on
+    worker threads with the job as their only argument.
+    """
+
+    def __init__(self, workers: int = None, on_progress=None, on_finished=None,
+                 on_failed=None):
+        self.executor = ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1)
+        self.on_progress = on_progress
+        self.on_finished = on_finished
+        self.on_failed = on_failed
+        self.jobs: dict[int, RenderJob] = {}
+        self._ids = itertools.count(1)
+
+    def submit(self, edit_list: EditList, output_path: str, smart_cut: bool = True,
+               output_kwargs: dict = None, tag=None) -> RenderJob:
+        """Queue a render of a snapshot of edit_list and return its job."""
+        snapshot = edit_list.with_source(edit_list.source_path, edit_list.source_state)
+        job = RenderJob(next(self._ids), snapshot, output_path, smart_cut, output_kwargs, tag)
+        self.jobs[job.job_id] = job
+        self.executor.submit(self._run, job)
+        return job
+
+    def submit_task(self, task, on_done):
+        """Run task() on a render worker and pass its future to on_done there."""
+        future = self.executor.submit(task)
+        future.add_done_callback(on_done)
+        return future
+
+    def _run(self, job: RenderJob):
+        if job.cancelled.is_set():
+            job.state = "cancelled"
+            self.jobs.pop(job.job_id, None)
+            return
+        job.state = "running"
+
+        def runner(command, duration: float = None, share: float = 1.0):
+            duration = job.edit_list.state.duration if duration is None else duration
+            run_with_progress(command, duration, job, self.on_progress, share)
+
+        try:
+            job.edit_list.render(
+                job.output_path, smart_cut=job.smart_cut, runner=runner, **job.output_kwargs
+            )
+            if job.cancelled.is_set():
+                raise RenderCancelled()
+        except RenderCancelled:
+            job.state = "cancelled"
+            return
+        except Exception as e:
+            # Probing, smart-cut planning and file handling can fail outside
+            # ffmpeg too; every failure must still reach a final state.
+            job.state = "failed"
+            if isinstance(e, ffmpeg.Error):
+                job.error = e.stderr.decode() if e.stderr else "Unknown FFmpeg error"
+            else:
+                job.error = f"{type(e).__name__}: {e}"
+            if self.on_failed is not None:
+                self.on_failed(job)
+            return
+        finally:
+            self.jobs.pop(job.job_id, None)
+
+        job.state = "done"
+        job.progress = 1.0
+        if self.on_finished is not None:
+            self.on_finished(job)
+
+    def cancel_all(self):
+        """Cancel every queued or running job."""
+        for job in list(self.jobs.values()):
+            job.cancel()
+
+    def shutdown(self):
+        """Cancel outstanding work and wait for the workers to exit."""
+        self.cancel_all()
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,163 @@
+"""Shot-boundary and motion detection over low-resolution, low-rate decodes."""
+
+import bisect
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import ffmpeg
+import numpy as np
+
+from tools.engagement import engagement_store
+from tools.media_info import media_index
+
+ANALYSIS_FPS = 4
+ANALYSIS_SIZE = (64, 36)
+HISTOGRAM_BINS = 16
+SEGMENT_SECONDS = 120
+CUT_THRESHOLD = 0.35
+MIN_SHOT_SECONDS = 0.5
+SHOT_SIGNAL = "shots"
+MOTION_SIGNAL = "motion"
+
+
+def plan_segments(keyframes, duration: float,
+                  target_seconds: float = SEGMENT_SECONDS) -> list[tuple[float, float]]:
+    """Split a video into ranges of roughly target_seconds that start on keyframes."""
+    boundaries = [0.0]
+    for time in keyframes or ():
+        if time - boundaries[-1] >= target_seconds and time < duration:
+            boundaries.append(time)
+    boundaries.append(duration)
+    return list(zip(boundaries, boundaries[1:]))
+
+
+def decode_segment(video_path: str, start: float, end: float) -> np.ndarray:
+    """Decode start..end as small grayscale frames sampled at ANALYSIS_FPS.
+
+    Seeking to a keyframe-aligned start is exact and skips decoding
+    everything before it, so segments decode independently. The decoder
+    skips non-reference frames and the loop filter, which a 64x36 sample
+    at a few frames per second cannot tell apart from a full decode.
+    """
+    width, height = ANALYSIS_SIZE
+    out, _ = (
+        ffmpeg.input(
+            video_path, ss=start, t=end - start, threads=1,
+            skip_frame="nonref", skip_loop_filter="all",
+        )
+        .filter("fps", ANALYSIS_FPS)
+        .filter("scale", width, height, flags="area")
+        .output("pipe:", format="rawvideo", pix_fmt="gray")
+        .run(capture_stdout=True, quiet=True)
+    )
+    return np.frombuffer(out, dtype=np.uint8).reshape(-1, height, width)
+
+
+def frame_differences(frames: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Return histogram and pixel difference scores between consecutive frames.
+
+    Both scores lie in [0, 1] and are computed for the whole block at once;
+    element i compares frame i with frame i + 1.
+    """
+    count = len(frames)
+    if count < 2:
+        return np.zeros(0), np.zeros(0)
+    bins = (frames // (256 // HISTOGRAM_BINS)).reshape(count, -1).astype(np.int64)
+    # Offset each frame's bins so one bincount produces every histogram.
+    bins += np.arange(count)[:, None] * HISTOGRAM_BINS
+    histograms = np.bincount(bins.ravel(), minlength=count * HISTOGRAM_BINS)
+    histograms = histograms.reshape(count, HISTOGRAM_BINS) / bins.shape[1]
+
+    histogram_diff = 0.5 * np.abs(np.diff(histograms, axis=0)).sum(axis=1)
+    pixel_diff = np.abs(np.diff(frames.astype(np.int16), axis=0)).mean(axis=(1, 2)) / 255.0
+    return histogram_diff, pixel_diff
+
+
+def _analyze_segment(video_path: str, start: float, end: float):
+    """Score one segment, returning its scores and edge frames for stitching."""
+    frames = decode_segment(video_path, start, end)
+    histogram_diff, pixel_diff = frame_differences(frames)
+    edges = (frames[0], frames[-1]) if len(frames) else None
+    return start, histogram_diff, pixel_diff, edges
+
+
+def detect_shots(histogram_diff: np.ndarray, pixel_diff: np.ndarray,
+                 times: np.ndarray) -> list[float]:
+    """Return cut times where the histogram jump is a strong local peak."""
+    padded = np.concatenate([[0.0], histogram_diff, [0.0]])
+    peaks = (histogram_diff >= padded[:-2]) & (histogram_diff > padded[2:])
+    # A genuine cut changes the pixels too, not just the brightness distribution.
+    candidates = np.flatnonzero(
+        peaks & (histogram_diff > CUT_THRESHOLD) & (pixel_diff > CUT_THRESHOLD / 4)
+    )
+    cuts = []
+    for index in candidates.tolist():
+        if not cuts or times[index] - cuts[-1] >= MIN_SHOT_SECONDS:
+            cuts.append(float(times[index]))
+    return cuts
+
+
+def analyze_scenes(video_path: str, digest: str = None,
+                   workers: int = None) -> tuple[list[float], np.ndarray]:
+    """Detect shot boundaries and per-second motion, storing both for the video.
+
+    Keyframe-aligned segments are decoded by parallel ffmpeg processes and
+    scored on threads, which is safe from the web server's worker threads
+    where forking is not. Differences across segment edges are filled in
+    from each segment's first and last frames.
+    """
+    digest = digest or media_index.digest(video_path)
+    info = media_index.get(video_path, keyframes=True)
+    segments = plan_segments(info.keyframes, info.duration)
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+        futures = [
+            pool.submit(_analyze_segment, video_path, start, end) for start, end in segments
+        ]
+        results = [future.result() for future in futures]
+
+    histogram_parts, pixel_parts, time_parts = [], [], []
+    previous_last = None
+    for start, histogram_diff, pixel_diff, edges in results:
+        if edges is None:
+            continue
+        first, last = edges
+        if previous_last is not None:
+            edge_histogram, edge_pixel = frame_differences(np.stack([previous_last, first]))
+            histogram_parts.append(edge_histogram)
+            pixel_parts.append(edge_pixel)
+            time_parts.append([start])
+        histogram_parts.append(histogram_diff)
+        pixel_parts.append(pixel_diff)
+        time_parts.append(start + (np.arange(len(histogram_diff)) + 1) / ANALYSIS_FPS)
+        previous_last = last
+
+    if not histogram_parts:
+        return [], np.zeros(0, dtype=np.float32)
+    histogram_diff = np.concatenate(histogram_parts)
+    pixel_diff = np.concatenate(pixel_parts)
+    times = np.concatenate(time_parts)
+
+    shots = detect_shots(histogram_diff, pixel_diff, times)
+    # Cuts are scene changes rather than motion, so they are left out of the average.
+    moving = np.ones(len(times), dtype=bool)
+    moving[np.searchsorted(times, shots)] = False
+    seconds = int(np.ceil(info.duration))
+    second_index = np.minimum(times.astype(np.int64), seconds - 1)
+    totals = np.bincount(second_index[moving], weights=pixel_diff[moving], minlength=seconds)
+    counts = np.bincount(second_index[moving], minlength=seconds)
+    motion = (totals / np.maximum(counts, 1)).astype(np.float32)
+
+    engagement_store.write(digest, MOTION_SIGNAL, motion)
+    engagement_store.write_events(digest, SHOT_SIGNAL, shots)
+    engagement_store.fuse(digest)
+    return shots, motion
+
+
+def snap_to_shot(time: float, shots: list[float], tolerance: float = 1.0) -> float:
+    """Move time onto the nearest shot boundary within tolerance seconds."""
+    position = bisect.bisect_left(shots, time)
+    nearest = min(shots[max(position - 1, 0): position + 1],
+                  key=lambda shot: abs(shot - time), default=None)
+    if nearest is not None and abs(nearest - time) <= tolerance:
+        return nearest
+    return time
@@ -0,0 +1,113 @@
+"""Frame-accurate trims that re-encode only the partial GOPs at each cut."""
+
+import bisect
+import os
+import shutil
+import tempfile
+
+import ffmpeg
+
+from tools.media_info import MediaInfo, media_index
+
+# Codecs whose copied GOPs can be concatenated with libx264-encoded edges.
+SMART_CUT_CODECS = ("h264",)
+
+
+def run_quietly(command, duration: float = None, share: float = 1.0):
+    """Run a compiled ffmpeg command; the default render runner, without progress.
+
+    Runners take the command, the seconds of output it writes and the share
+    of the whole render it accounts for.
+    """
+    command.run(quiet=True)
+
+
+def _encode_edge(video_path: str, start: float, end: float, output_path: str, info: MediaInfo):
+    """Build a re-encode of a partial GOP with parameters compatible with the copied GOPs."""
+    timescale = int(info.time_base.split("/")[1])
+    return (
+        ffmpeg.input(video_path, ss=start, t=end - start)
+        .output(
+            output_path,
+            an=None,
+            vcodec="libx264",
+            crf=18,
+            pix_fmt=info.pix_fmt,
+            video_track_timescale=timescale,
+        )
+        .overwrite_output()
+    )
+
+
+def _copy_gops(video_path: str, start: float, end: float, output_path: str):
+    """Build a stream copy of whole GOPs starting on the keyframe at start."""
+    return (
+        ffmpeg.input(video_path, ss=start, t=end - start)
+        .output(output_path, an=None, c="copy", avoid_negative_ts="make_zero")
+        .overwrite_output()
+    )
+
+
+def smart_trim(
+    video_path: str,
+    start: float,
+    end: float,
+    output_path: str,
+    info: MediaInfo = None,
+    runner=None,
+) -> bool:
+    """Cut [start, end) frame-accurately, copying every whole GOP inside the range.
+
+    Each ffmpeg step is passed to runner, weighted by the seconds it writes,
+    so progress and cancellation cover the whole cut. Returns False without
+    writing anything when the source cannot be smart-cut, so callers can
+    fall back to a full re-encode.
+    """
+    runner = runner or run_quietly
+    info = info or media_index.get(video_path)
+    if info.codec not in SMART_CUT_CODECS:
+        return False
+    if info.keyframes is None or info.time_base is None:
+        info = media_index.get(video_path, keyframes=True)
+
+    keyframes = info.keyframes
+    first = bisect.bisect_left(keyframes, start)
+    last = bisect.bisect_right(keyframes, end) - 1
+    if first >= len(keyframes) or last < first:
+        return False
+    copy_start, copy_end = keyframes[first], keyframes[last]
+    if copy_end <= copy_start:
+        return False
+
+    # Every step writes part of the cut and the final mux writes all of it.
+    total = 2 * (end - start)
+    work_dir = tempfile.mkdtemp(prefix="smartcut-")
+    try:
+        pieces = []
+        if copy_start > start:
+            pieces.append(os.path.join(work_dir, "head.mp4"))
+            command = _encode_edge(video_path, start, copy_start, pieces[-1], info)
+            runner(command, copy_start - start, (copy_start - start) / total)
+        pieces.append(os.path.join(work_dir, "body.mp4"))
+        command = _copy_gops(video_path, copy_start, copy_end, pieces[-1])
+        runner(command, copy_end - copy_start, (copy_end - copy_start) / total)
+        if end > copy_end:
+            pieces.append(os.path.join(work_dir, "tail.mp4"))
+            command = _encode_edge(video_path, copy_end, end, pieces[-1], info)
+            runner(command, end - copy_end, (end - copy_end) / total)
+
+        list_path = os.path.join(work_dir, "pieces.txt")
+        with open(list_path, "w") as list_file:
+            list_file.writelines(f"file '{piece}'\n" for piece in pieces)
+
+        video = ffmpeg.input(list_path, f="concat", safe=0).video
+        if info.has_audio:
+            # Audio is cheap to encode, so cut it sample-accurately in one pass.
+            audio = ffmpeg.input(video_path, ss=start, t=end - start).audio
+            output = ffmpeg.output(video, audio, output_path, vcodec="copy", acodec="aac")
+        else:
+            output = ffmpeg.output(video, output_path, vcodec="copy")
+        runner(output.overwrite_output(), end - start, 0.5)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return True
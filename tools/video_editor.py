@@ -1,8 +1,8 @@
 """PyQt5-based video editor with LLM-guided editing capabilities."""
 
+import os
 import sys
 import tempfile
-import cv2
 import ffmpeg
 import numpy as np
 from PyQt5.QtWidgets import (
@@ -12,197 +12,295 @@ from PyQt5.QtWidgets import (
     QLabel,
     QLineEdit,
     QMessageBox,
+    QProgressBar,
     QPushButton,
     QFileDialog,
 )
 from PyQt5.QtGui import QImage, QPixmap
 from PyQt5.QtCore import Qt, QThread, pyqtSignal
 
+from tools.commands import compile_command
+from tools.edit_list import EditList, EditOperation, normalize_operations
+from tools.frame_cache import FrameSeeker
+from tools.media_info import media_index
+from tools.playback import DISPLAY_SIZE, PlaybackEngine, fit_size
+from tools.proxy import build_proxy
+from tools.render_cache import RenderCache
+from tools.render_jobs import RenderQueue
+
+# Previews are re-rendered from the source on every edit, so favour speed.
+PREVIEW_OUTPUT = {"preset": "ultrafast", "crf": 28}
+# Exports longer than this are split into chunks encoded in parallel.
+EXPORT_CHUNK_SECONDS = 300
+
+
+class ProxyBuilder(QThread):
+    """Background thread that transcodes a low-resolution editing proxy."""
+
+    ready = pyqtSignal(str)
+
+    def __init__(self, video_path: str):
+        super().__init__()
+        self.video_path = video_path
+
+    def run(self):
+        try:
+            self.ready.emit(build_proxy(self.video_path))
+        except ffmpeg.Error as e:
+            stderr = e.stderr.decode() if e.stderr else "Unknown FFmpeg error"
+            print(f"Failed to build proxy: {stderr}")
+
 
 class VideoProcessor(QThread):
     """Thread-based video processor with editing operations."""
 
     update_signal = pyqtSignal(QImage)
     finished = pyqtSignal()
+    render_progress = pyqtSignal(float)
+    render_done = pyqtSignal(object)
+    render_failed = pyqtSignal(object)
+    edit_resolved = pyqtSignal(object, object, str)
 
-    def __init__(self, video_path: str):
+    def __init__(self, video_path: str, render_cache: RenderCache = None):
         super().__init__()
         self.original_video_path = video_path
         self.video_path = video_path
+        # Rendered path of every edit state, or None while its render is in flight.
         self.video_history = [video_path]
+        self.history_keys: list[str] = []
+        self.render_cache = render_cache or RenderCache()
+        self.render_jobs = {}
+        # Queue callbacks fire on worker threads; signals hand them to the GUI thread.
+        self.render_queue = RenderQueue(
+            on_progress=lambda job: self.render_progress.emit(job.progress),
+            on_finished=self.render_done.emit,
+            on_failed=self.render_failed.emit,
+        )
+        self.render_done.connect(self._on_render_done)
+        self.render_failed.connect(self._on_render_failed)
+        self.edit_resolved.connect(self._on_edit_resolved)
+        self._edit_list = None
+        self.proxy_builder = None
+        self.smart_cut = True
+        self.display_size = DISPLAY_SIZE
+        self.seeker = None
+        self.playhead = 0
         self.running = True
-        self.trim_required = False
-        self.start_sec = 0
-        self.end_sec = 0
 
     def run(self):
         while self.running:
-            if self.trim_required:
-                self.trim_video(self.start_sec, self.end_sec)
-                self.trim_required = False
-                self.finished.emit()
             self.play_video()
 
-    def trim_video(self, trim_start_sec: float, trim_end_sec: float):
-        """Trim video from both ends by specified seconds."""
-        probe = ffmpeg.probe(self.video_path)
-        total_duration = float(probe["format"]["duration"])
-
-        adjusted_start_sec = trim_start_sec
-        adjusted_end_sec = total_duration - trim_end_sec
-        duration_to_keep = adjusted_end_sec - adjusted_start_sec
-
-        if duration_to_keep <= 0:
-            print("Error: The resulting duration is non-positive after trimming.")
+    @property
+    def edit_list(self) -> EditList:
+        """Edit list over the working source, probed on first use."""
+        if self._edit_list is None:
+            self._edit_list = EditList(self.original_video_path)
+        return self._edit_list
+
+    @edit_list.setter
+    def edit_list(self, edit_list: EditList):
+        self._edit_list = edit_list
+
+    def build_proxy(self):
+        """Generate an editing proxy in the background and switch to it when ready."""
+        self.proxy_builder = ProxyBuilder(self.original_video_path)
+        self.proxy_builder.ready.connect(self.use_proxy)
+        self.proxy_builder.start()
+
+    def use_proxy(self, proxy_path: str):
+        """Move interactive editing and playback onto the proxy."""
+        self.edit_list = self.edit_list.with_source(proxy_path)
+        self.video_history[0] = proxy_path
+        if len(self.video_history) == 1:
+            self._switch_to(proxy_path)
+
+    def _switch_to(self, video_path: str):
+        """Play a different rendered state, restarting playback if it was running."""
+        if video_path == self.video_path:
+            return
+        was_running = self.isRunning()
+        self.pause_playback()
+        self.video_path = video_path
+        if was_running:
+            self.start_playback()
+
+    def _apply_edit(self, operation: EditOperation, action: str):
+        """Record an edit and queue a background render of the whole edit list.
+
+        Playback stays on the last rendered state until the job lands.
+        """
+        if operation.name == "jump_cut" and not operation.args:
+            # Silence detection decodes the whole audio track, so run it on a
+            # render worker and apply the resolved edit when it lands.
+            snapshot = self.edit_list.with_source(
+                self.edit_list.source_path, self.edit_list.source_state
+            )
+            self.render_queue.submit_task(
+                snapshot.detect_jump_cut,
+                lambda future: self.edit_resolved.emit(future, snapshot, action),
+            )
             return
-
-        temp_video_path = tempfile.mktemp(suffix=".mp4")
 
         try:
-            (
-                ffmpeg.input(self.video_path, ss=adjusted_start_sec, t=duration_to_keep)
-                .output(temp_video_path, c="copy")
-                .run(overwrite_output=True)
-            )
-            self.video_path = temp_video_path
-            self.video_history.append(self.video_path)
-        except ffmpeg.Error as e:
-            stderr = e.stderr.decode() if e.stderr else "Unknown FFmpeg error"
-            print(f"Failed to trim video: {stderr}")
+            self.edit_list.append(operation)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return
 
-    def crop_video(self, scale: float):
-        """Crop video to specified aspect ratio scale."""
-        probe = ffmpeg.probe(self.video_path)
-        video_stream = next(
-            (s for s in probe["streams"] if s["codec_type"] == "video"), None
+        # Hashing a multi-GB source would stall the GUI thread, so renders are
+        # keyed by the source's path, size and mtime instead of its content.
+        key = self.render_cache.key(
+            media_index.file_key(self.edit_list.source_path),
+            normalize_operations(self.edit_list.operations),
+            {"smart_cut": self.smart_cut, **PREVIEW_OUTPUT},
         )
-        original_width = int(video_stream["width"])
-        original_height = int(video_stream["height"])
+        self.history_keys.append(key)
+        self.render_cache.pin(self.history_keys)
+        cached_path = self.render_cache.get(key)
+        self.video_history.append(cached_path)
+
+        if cached_path is not None:
+            self._switch_to(cached_path)
+        elif key not in self.render_jobs:
+            self.render_jobs[key] = self.render_queue.submit(
+                self.edit_list,
+                tempfile.mktemp(suffix=".mp4"),
+                smart_cut=self.smart_cut,
+                output_kwargs=PREVIEW_OUTPUT,
+                tag=(key, action),
+            )
 
-        new_width = int(original_height * scale)
-        if new_width % 2 != 0:
-            new_width -= 1
+    def _on_edit_resolved(self, future, snapshot: EditList, action: str):
+        """Apply an edit resolved on a worker, if the edit list has not moved on."""
+        if snapshot.operations != self.edit_list.operations:
+            print(f"Failed to {action}: the edits changed while it was being prepared.")
+            return
+        try:
+            operation = future.result()
+        except (ValueError, OSError) as e:
+            print(f"Failed to {action}: {e}")
+            return
+        self._apply_edit(operation, action)
+
+    def _on_render_done(self, job):
+        """Cache a finished render and show it if it is still the latest state."""
+        key, _ = job.tag
+        if key is None:
+            print(f"Exported to {job.output_path}")
+            self.finished.emit()
+            return
+        self.render_jobs.pop(key, None)
+        info = media_index.get(job.output_path)
+        cached_path = self.render_cache.put(key, job.output_path)
+        media_index.record(cached_path, info)
+        for index, history_key in enumerate(self.history_keys, start=1):
+            if history_key == key:
+                self.video_history[index] = cached_path
+        if self.history_keys and self.history_keys[-1] == key:
+            self._switch_to(cached_path)
+        self.finished.emit()
+
+    def _on_render_failed(self, job):
+        """Report a failed render and drop its edit if it is the latest one."""
+        key, action = job.tag
+        self.render_jobs.pop(key, None)
+        print(f"Failed to {action}: {job.error}")
+        if self.history_keys and self.history_keys[-1] == key:
+            self.undo_last_action()
+
+    def cancel_renders(self):
+        """Cancel in-flight renders and drop the edits still waiting on them."""
+        while self.history_keys and self.history_keys[-1] in self.render_jobs:
+            self.undo_last_action()
+        self.render_queue.cancel_all()
+        self.render_jobs.clear()
+
+    def apply_operation(self, operation: EditOperation):
+        """Apply a parsed edit operation."""
+        self._apply_edit(operation, f"apply {operation.name.replace('_', ' ')}")
 
-        x_offset = (original_width - new_width) // 2
-        crop_filter = f"{new_width}:{original_height}:{x_offset}:0"
-        temp_video_path = tempfile.mktemp(suffix=".mp4")
+    def trim_video(self, trim_start_sec: float, trim_end_sec: float):
+        """Trim video from both ends by specified seconds."""
+        self._apply_edit(EditOperation("trim", (trim_start_sec, trim_end_sec)), "trim video")
 
-        try:
-            (
-                ffmpeg.input(self.video_path)
-                .filter("crop", *crop_filter.split(":"))
-                .output(temp_video_path, vcodec="libx264", crf=22)
-                .overwrite_output()
-                .run()
-            )
-            self.video_path = temp_video_path
-            self.video_history.append(self.video_path)
-        except ffmpeg.Error as e:
-            print(f"Failed to crop video: {e.stderr.decode('utf-8')}")
+    def crop_video(self, scale: float):
+        """Crop video to specified aspect ratio scale."""
+        self._apply_edit(EditOperation("crop", (scale,)), "crop video")
 
     def zoom_video(self, zoom_scale: float):
         """Zoom into video by specified scale factor."""
-        probe = ffmpeg.probe(self.video_path)
-        video_stream = next(
-            (s for s in probe["streams"] if s["codec_type"] == "video"), None
-        )
-        original_width = int(video_stream["width"])
-        original_height = int(video_stream["height"])
-
-        new_width = int(original_width * zoom_scale)
-        new_height = int(original_height * zoom_scale)
-        new_width += new_width % 2
-        new_height += new_height % 2
-
-        x_offset = (original_width - new_width) // 2
-        y_offset = (original_height - new_height) // 2
-        temp_video_path = tempfile.mktemp(suffix=".mp4")
-
-        try:
-            (
-                ffmpeg.input(self.video_path)
-                .filter("crop", w=new_width, h=new_height, x=x_offset, y=y_offset)
-                .output(temp_video_path, vcodec="libx264", crf=22)
-                .overwrite_output()
-                .run()
-            )
-            self.video_path = temp_video_path
-            self.video_history.append(self.video_path)
-        except ffmpeg.Error as e:
-            print(f"Failed to zoom video: {e.stderr.decode('utf-8')}")
+        self._apply_edit(EditOperation("zoom", (zoom_scale,)), "zoom video")
 
     def change_speed(self, speed_factor: float):
         """Change video playback speed."""
-        temp_video_path = tempfile.mktemp(suffix=".mp4")
-
-        try:
-            (
-                ffmpeg.input(self.video_path)
-                .filter("setpts", f"{1/speed_factor}*PTS")
-                .output(temp_video_path, vcodec="libx264", crf=22)
-                .run(overwrite_output=True)
-            )
-            self.video_path = temp_video_path
-            self.video_history.append(self.video_path)
-        except ffmpeg.Error as e:
-            print(f"Failed to change video speed: {e.stderr.decode('utf-8')}")
+        self._apply_edit(EditOperation("speed", (speed_factor,)), "change video speed")
 
     def fade_in_video(self, duration: int = 2):
         """Apply fade-in effect to video."""
-        temp_video_path = tempfile.mktemp(suffix=".mp4")
-
-        try:
-            (
-                ffmpeg.input(self.video_path)
-                .filter("fade", t="in", d=duration)
-                .output(temp_video_path, vcodec="libx264", crf=22)
-                .run(overwrite_output=True)
-            )
-            self.video_path = temp_video_path
-            self.video_history.append(self.video_path)
-        except ffmpeg.Error as e:
-            print(f"Failed to apply fade in effect: {e.stderr.decode('utf-8')}")
+        self._apply_edit(EditOperation("fade_in", (duration,)), "apply fade in effect")
 
     def fade_out_video(self, duration: int = 2):
         """Apply fade-out effect to video."""
-        temp_video_path = tempfile.mktemp(suffix=".mp4")
-        probe = ffmpeg.probe(self.video_path)
-        total_duration = float(probe["format"]["duration"])
-        fade_start = total_duration - duration
-
-        try:
-            (
-                ffmpeg.input(self.video_path)
-                .filter("fade", t="out", start_time=fade_start, d=duration)
-                .output(temp_video_path, vcodec="libx264", crf=22)
-                .run(overwrite_output=True)
-            )
-            self.video_path = temp_video_path
-            self.video_history.append(self.video_path)
-        except ffmpeg.Error as e:
-            print(f"Failed to apply fade out effect: {e.stderr.decode('utf-8')}")
+        self._apply_edit(EditOperation("fade_out", (duration,)), "apply fade out effect")
+
+    def jump_cut_video(self):
+        """Cut the silent spans out of the video."""
+        self._apply_edit(EditOperation("jump_cut"), "cut the dead air")
+
+    def export_video(self, output_path: str):
+        """Queue a render of the full edit list from the original source."""
+        edit_list = self.edit_list.with_source(self.original_video_path)
+        chunks = min(os.cpu_count() or 1, int(edit_list.state.duration // EXPORT_CHUNK_SECONDS))
+        self.render_queue.submit(
+            edit_list,
+            output_path,
+            smart_cut=self.smart_cut,
+            output_kwargs={"chunks": max(chunks, 1)},
+            tag=(None, "export video"),
+        )
 
     def play_video(self):
         """Play video and emit frames for display."""
-        cap = cv2.VideoCapture(self.video_path)
-        fps = cap.get(cv2.CAP_PROP_FPS)
-
-        while self.running:
-            ret, frame = cap.read()
-            if not ret:
-                cap.release()
-                cap = cv2.VideoCapture(self.video_path)
-                continue
+        info = media_index.get(self.video_path)
+        size = fit_size(info.width, info.height, self.display_size)
+        engine = PlaybackEngine(self.video_path, info.fps, info.duration, size=size)
 
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        for frame in engine.frames(lambda: self.running):
             image = QImage(
-                rgb_frame.data, rgb_frame.shape[1], rgb_frame.shape[0], QImage.Format_RGB888
+                frame.data, frame.shape[1], frame.shape[0], frame.strides[0],
+                QImage.Format_RGB888,
             )
-            scaled = image.scaled(640, 480, Qt.KeepAspectRatio)
-            self.update_signal.emit(scaled)
-            QThread.msleep(int(1000 / fps))
+            # The frame is a pooled decoder buffer that is reused, so the
+            # queued signal must carry its own copy of the pixels.
+            self.update_signal.emit(image.copy())
+
+    def _show_frame(self, index: int):
+        """Decode the frame at index through the seek cache and display it."""
+        if self.seeker is None or self.seeker.video_path != self.video_path:
+            if self.seeker is not None:
+                self.seeker.release()
+            self.seeker = FrameSeeker(self.video_path, self.display_size)
+        frame = self.seeker.frame(index)
+        if frame is None:
+            return
+        self.playhead = min(max(index, 0), self.seeker.frame_count - 1)
+        image = QImage(
+            frame.data, frame.shape[1], frame.shape[0], frame.strides[0],
+            QImage.Format_RGB888,
+        )
+        self.update_signal.emit(image.copy())
 
-        cap.release()
+    def seek(self, seconds: float):
+        """Show the frame at a timestamp, with playback paused."""
+        self.pause_playback()
+        fps = media_index.get(self.video_path).fps or 30
+        self._show_frame(int(round(seconds * fps)))
+
+    def step_frame(self, delta: int = 1):
+        """Step the paused playhead by a number of frames."""
+        self.pause_playback()
+        self._show_frame(self.playhead + delta)
 
     def start_playback(self):
         """Start video playback."""
@@ -219,7 +317,14 @@ class VideoProcessor(QThread):
         """Undo the last editing action."""
         if len(self.video_history) > 1:
             self.video_history.pop()
-            self.video_path = self.video_history[-1]
+            key = self.history_keys.pop()
+            if key not in self.history_keys and key in self.render_jobs:
+                self.render_jobs.pop(key).cancel()
+            self.render_cache.pin(self.history_keys)
+            self.edit_list.pop()
+            # An earlier state still rendering is switched to when it lands.
+            if self.video_history[-1] is not None:
+                self._switch_to(self.video_history[-1])
             print("Last action undone.")
         else:
             print("No actions to undo.")
@@ -238,19 +343,30 @@ class VideoEditorApp(QWidget):
         self.upload_button = QPushButton("Upload Video")
         self.command_input = QLineEdit()
         self.command_input.setPlaceholderText(
-            'Enter command (e.g., "trim the video by 1 second on each side", "undo")'
+            'Enter command (e.g., "trim the video by 1 second on each side", "undo", "export")'
         )
         self.command_input.returnPressed.connect(self.process_command)
         self.upload_button.clicked.connect(self.upload_video)
 
         self.layout.addWidget(self.upload_button)
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.hide()
+
         self.layout.addWidget(self.video_label)
+        self.layout.addWidget(self.progress_bar)
         self.layout.addWidget(self.command_input)
         self.setLayout(self.layout)
 
-        self.video_processor = VideoProcessor("./stock.mp4")
+        self.render_cache = RenderCache()
+        self.video_processor = VideoProcessor("./stock.mp4", self.render_cache)
+        self._connect_processor()
+
+    def _connect_processor(self):
+        """Wire the current video processor's signals to the window."""
         self.video_processor.update_signal.connect(self.update_image)
-        self.video_processor.finished.connect(self.on_finished_trim)
+        self.video_processor.finished.connect(self.on_render_finished)
+        self.video_processor.render_progress.connect(self.update_progress)
 
     def upload_video(self):
         """Open file dialog to upload a video."""
@@ -259,83 +375,76 @@ class VideoEditorApp(QWidget):
         )
         if video_path:
             self.video_processor.pause_playback()
-            self.video_processor = VideoProcessor(video_path)
-            self.video_processor.update_signal.connect(self.update_image)
-            self.video_processor.finished.connect(self.on_finished_trim)
+            self.video_processor.cancel_renders()
+            self.video_processor = VideoProcessor(video_path, self.render_cache)
+            self._connect_processor()
+            self.video_processor.display_size = (
+                self.video_label.width(),
+                self.video_label.height(),
+            )
+            self.video_processor.build_proxy()
             self.video_processor.start_playback()
 
+    def export_video(self):
+        """Render the edit list at full quality to a user-chosen file."""
+        output_path, _ = QFileDialog.getSaveFileName(
+            self, "Export Video", "", "Video Files (*.mp4)"
+        )
+        if output_path:
+            self.video_processor.export_video(output_path)
+
     def update_image(self, image: QImage):
         """Update the video display with a new frame."""
-        self.video_label.setPixmap(
-            QPixmap.fromImage(image).scaled(
-                self.video_label.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation
-            )
-        )
+        pixmap = QPixmap.fromImage(image)
+        label_size = self.video_label.size()
+        # Frames are normally decoded at the label's size already.
+        if image.width() > label_size.width() or image.height() > label_size.height():
+            pixmap = pixmap.scaled(label_size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        self.video_label.setPixmap(pixmap)
+
+    def resizeEvent(self, event):
+        """Decode at the new label size from the next playback start."""
+        super().resizeEvent(event)
+        size = self.video_label.size()
+        self.video_processor.display_size = (max(size.width(), 1), max(size.height(), 1))
 
     def process_command(self):
         """Process user command for video editing."""
-        command = self.command_input.text().lower()
-
-        if command == "undo":
-            self.video_processor.pause_playback()
-            self.video_processor.undo_last_action()
-            self.video_processor.start_playback()
-
-        elif command == "fade in":
-            self.video_processor.pause_playback()
-            self.video_processor.fade_in_video(2)
-            self.video_processor.start_playback()
-
-        elif command == "fade out":
-            self.video_processor.pause_playback()
-            self.video_processor.fade_out_video(2)
-            self.video_processor.start_playback()
-
-        elif command == "zoom in":
-            self.video_processor.pause_playback()
-            self.video_processor.zoom_video(0.9)
-            self.video_processor.start_playback()
-
-        elif "speed up" in command:
-            self._handle_speed_command(command, speedup=True)
-
-        elif "slow down" in command:
-            self._handle_speed_command(command, speedup=False)
-
-        elif command.startswith("trim the video by") and command.endswith("seconds on each side"):
-            parts = command.split()
-            seconds = int(parts[4])
-            self.video_processor.pause_playback()
-            self.video_processor.start_sec = seconds
-            self.video_processor.end_sec = seconds
-            self.video_processor.trim_required = True
-            self.video_processor.start_playback()
-
-        elif command == "crop to mobile dimensions":
-            self.video_processor.pause_playback()
-            self.video_processor.crop_video(9 / 16)
-            self.video_processor.start_playback()
-
-        else:
-            QMessageBox.warning(self, "Error", "Invalid command format. Please try again.")
-
-    def _handle_speed_command(self, command: str, speedup: bool):
-        """Handle speed up/down commands."""
         try:
-            parts = command.split()
-            factor = float(parts[-1])
-            self.video_processor.pause_playback()
-            if speedup:
-                self.video_processor.change_speed(factor)
-            else:
-                self.video_processor.change_speed(1 / factor)
-            self.video_processor.start_playback()
-        except ValueError:
-            QMessageBox.warning(self, "Error", "Invalid speed factor. Please try again.")
+            command = compile_command(self.command_input.text())
+        except ValueError as e:
+            QMessageBox.warning(self, "Error", f"{e} Please try again.")
+            return
+        if command is None:
+            QMessageBox.warning(self, "Error", "Invalid command format. Please try again.")
+            return
 
-    def on_finished_trim(self):
-        """Handle trim completion."""
-        print("Trimmed")
+        actions = {
+            "edit": lambda: self.video_processor.apply_operation(command.operation),
+            "undo": self.video_processor.undo_last_action,
+            "cancel": self.cancel_renders,
+            "play": self.video_processor.start_playback,
+            "pause": self.video_processor.pause_playback,
+            "step": lambda: self.video_processor.step_frame(int(command.value)),
+            "seek": lambda: self.video_processor.seek(command.value),
+            "export": self.export_video,
+        }
+        actions[command.action]()
+
+    def cancel_renders(self):
+        """Cancel queued and running renders and hide their progress."""
+        self.video_processor.cancel_renders()
+        self.progress_bar.hide()
+
+    def update_progress(self, progress: float):
+        """Show the progress of the render in flight."""
+        self.progress_bar.show()
+        self.progress_bar.setValue(int(progress * 100))
+
+    def on_render_finished(self):
+        """Handle render completion."""
+        self.progress_bar.hide()
+        print("Render finished")
 
 
 def main():
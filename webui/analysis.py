@@ -0,0 +1,23 @@
+"""Background content analysis of uploads feeding the engagement store."""
+
+import ffmpeg
+
+from tools.audio_analysis import analyze_audio
+from tools.scene_detect import analyze_scenes
+from webui import jobs, media_store
+
+
+def _analyze(media_id: str):
+    path = media_store.media_path(media_id)
+    digest = media_id.split(".")[0]  # Media ids are already content hashes.
+    try:
+        analyze_audio(path, digest)
+        analyze_scenes(path, digest)
+    except ffmpeg.Error as e:
+        stderr = e.stderr.decode() if e.stderr else "Unknown FFmpeg error"
+        print(f"Failed to analyze {media_id}: {stderr}")
+
+
+def start_analysis(media_id: str):
+    """Analyze a stored upload for engagement signals on the media job pool."""
+    jobs.submit("analysis", media_id, _analyze)
@@ -9,10 +9,15 @@ from webui.state import QA, State
 
 def message(qa: QA) -> rx.Component:
     """Render a single question/answer message pair."""
+    return message_pair(qa.question, qa.answer)
+
+
+def message_pair(question, answer) -> rx.Component:
+    """Render a question and its answer as chat bubbles."""
     return rx.chakra.box(
         rx.chakra.box(
             rx.chakra.text(
-                qa.question,
+                question,
                 bg=styles.border_color,
                 shadow=styles.shadow_light,
                 **styles.message_style,
@@ -22,7 +27,7 @@ def message(qa: QA) -> rx.Component:
         ),
         rx.chakra.box(
             rx.chakra.text(
-                qa.answer,
+                answer,
                 bg=styles.accent_color,
                 shadow=styles.shadow_light,
                 **styles.message_style,
@@ -39,6 +44,10 @@ def chat() -> rx.Component:
     return rx.chakra.vstack(
         rx.heading("LLM powered Editor", align="center", weight="medium"),
         rx.chakra.box(rx.foreach(State.chats[State.current_chat], message)),
+        rx.cond(
+            State.pending_question != "",
+            message_pair(State.pending_question, State.streaming_answer),
+        ),
         py="8",
         flex="1",
         width="100%",
@@ -3,7 +3,11 @@
 import reflex as rx
 
 from webui import styles
+from webui.engagement import engagement_url
+from webui.hls import is_packaged, master_url
+from webui.media_store import media_url
 from webui.state import State
+from webui.thumbnails import index_url
 
 
 class VideoDisplayState(State):
@@ -19,16 +23,23 @@ class VideoDisplayState(State):
                 "<script src='./custom_video_controls.js'></script>"
                 "<div style='width: 100%;'>"
             )
-            for url_v in video_segments[:1]:
+            for media_id in video_segments[:1]:
+                hls_attribute = (
+                    f'data-hls="{master_url(media_id)}"' if is_packaged(media_id) else ""
+                )
+                # Always set, so previews appear once generation finishes without
+                # recomputing this HTML and restarting playback.
+                thumbs_attribute = f'data-thumbs="{index_url(media_id)}"'
                 videos_html += f"""
                 <div class="custom-video-player">
-                    <video id="video_1" width="100%" height="auto" controls autoplay loop muted>
-                        <source src="/{url_v}" type="video/mp4">
+                    <video id="video_1" width="100%" height="auto" controls autoplay loop muted {hls_attribute} {thumbs_attribute} data-engagement="{engagement_url(media_id)}">
+                        <source src="{media_url(media_id)}" type="video/mp4">
                         Your browser does not support the video tag.
                     </video>
                     <button id="playPauseBtn" data-video-id="video_1" style="margin: 20px; background-color: #9B6A6C; border-radius: 10px; padding: 10px 20px 10px 20px; color: white; cursor: pointer;">Pause</button>
                     <div class="seek-bar-container" style="position: relative; width: 100%;">
                         <input type="range" id="seekBar" value="0" min="0" max="100" step="1" style="width: 100%; z-index: 2; position: relative;">
+                        <div id="seekPreview" style="position: absolute; bottom: 100%; display: none; z-index: 3; pointer-events: none; border: 1px solid white; border-radius: 4px;"></div>
                         <canvas id="highlightCanvas" style="position: absolute; top: 0; left: 0; width: 100%; height: 100%; z-index: 2; pointer-events: none; opacity: 0.4;"></canvas>
                     </div>
                 </div>
@@ -44,28 +55,28 @@ def videodisplay() -> rx.Component:
     color = "#776885"
 
     upload_section = rx.chakra.vstack(
-        rx.upload(
+        rx.box(
             rx.chakra.vstack(
-                rx.button(
-                    "Select File",
-                    _hover={"bg": "#5F1A37"},
+                # Files are streamed to the upload route by stream_upload.js, so
+                # the backend never holds a whole upload in memory.
+                rx.el.input(
+                    type="file",
+                    id="streamUploadInput",
+                    accept="video/*",
+                    multiple=True,
                     style=styles.input_style,
                 ),
-                rx.text("Drag and drop Stream here or Click to Select"),
+                rx.text("Choose a Stream to Upload"),
             ),
             border=f"1px dotted {color}",
             padding="50px",
             border_radius="lg",
         ),
-        rx.hstack(rx.foreach(rx.selected_files, rx.text)),
+        rx.el.div(id="uploadStatus"),
         rx.button(
             "Upload",
-            on_click=lambda: State.handle_upload(rx.upload_files()),
-            bg=color,
-        ),
-        rx.button(
-            "Clear",
-            on_click=rx.clear_selected_files,
+            on_click=State.start_upload,
+            disabled=State.uploading,
             bg=color,
         ),
         spacing="4",
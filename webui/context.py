@@ -0,0 +1,77 @@
+"""Token-budgeted conversation context kept incrementally for each chat."""
+
+import os
+from collections import deque
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CHOPSTICKZ_CONTEXT_TOKENS", "3000"))
+SUMMARY_TOKEN_BUDGET = 400
+SUMMARY_SNIPPET_CHARS = 160
+
+
+def count_tokens(text: str) -> int:
+    """Estimate tokens at roughly four characters each, without a tokenizer."""
+    return len(text) // 4 + 1
+
+
+def summarize_turns(summary: str, turns: list[tuple[str, str]]) -> str:
+    """Fold evicted turns into the running summary, keeping its newest lines.
+
+    Each turn is condensed to the start of its question and answer, so the
+    summary stays cheap to rebuild and bounded by SUMMARY_TOKEN_BUDGET.
+    """
+    lines = summary.splitlines() if summary else []
+    for question, answer in turns:
+        lines.append(
+            f"- User: {question[:SUMMARY_SNIPPET_CHARS]} / "
+            f"Assistant: {answer[:SUMMARY_SNIPPET_CHARS]}"
+        )
+    while len(lines) > 1 and count_tokens("\n".join(lines)) > SUMMARY_TOKEN_BUDGET:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+class ChatContext:
+    """Recent turns of one chat under a token budget, plus a summary of older ones.
+
+    Turns are added as they complete and the oldest are evicted once the
+    running token count exceeds the budget, so building a prompt never walks
+    the whole history. Evicted turns are folded into a cached summary that
+    is only rebuilt when the window has moved since the last prompt.
+    """
+
+    def __init__(self, budget: int = CONTEXT_TOKEN_BUDGET, summarize=summarize_turns):
+        self.budget = budget
+        self.summarize = summarize
+        self.turns: deque[tuple[str, str, int]] = deque()
+        self.tokens = 0
+        self.evicted: list[tuple[str, str]] = []
+        self.summary = ""
+
+    def add_turn(self, question: str, answer: str):
+        """Append a finished turn and slide the window to fit the budget."""
+        tokens = count_tokens(question) + count_tokens(answer)
+        self.turns.append((question, answer, tokens))
+        self.tokens += tokens
+        while self.tokens > self.budget and len(self.turns) > 1:
+            old_question, old_answer, old_tokens = self.turns.popleft()
+            self.tokens -= old_tokens
+            self.evicted.append((old_question, old_answer))
+
+    def messages(self, question: str, system: str = None) -> list[dict[str, str]]:
+        """Return the prompt messages for a new question."""
+        if self.evicted:
+            self.summary = self.summarize(self.summary, self.evicted)
+            self.evicted = []
+
+        messages = []
+        if system:
+            messages.append({"role": "system", "content": system})
+        if self.summary:
+            messages.append(
+                {"role": "system", "content": f"Summary of earlier turns:\n{self.summary}"}
+            )
+        for old_question, old_answer, _ in self.turns:
+            messages.append({"role": "user", "content": old_question})
+            messages.append({"role": "assistant", "content": old_answer})
+        messages.append({"role": "user", "content": question})
+        return messages
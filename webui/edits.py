@@ -0,0 +1,69 @@
+"""Apply chat edit commands to uploads in the media store."""
+
+import os
+import tempfile
+
+from tools.edit_list import EditList, EditOperation
+from tools.jump_cut import span_pairs
+from tools.media_info import media_index
+from tools.render_cache import content_hash
+from webui import media_store
+
+
+def describe_edit(operation: EditOperation, before: float, after: float) -> str:
+    """Summarise an applied edit for the chat transcript."""
+    if operation.name == "jump_cut":
+        gaps = len(span_pairs(operation.args)) - 1
+        return f"Cut the dead air: removed {before - after:.1f}s across {gaps} gap(s)."
+    return f"Applied {operation.name.replace('_', ' ')}; the video is now {after:.1f}s long."
+
+
+def render_edit_list(edit_list: EditList) -> str:
+    """Render an edit list into the media store and return the new media id."""
+    os.makedirs(media_store.MEDIA_DIR, exist_ok=True)
+    handle, output_path = tempfile.mkstemp(suffix=".mp4", dir=media_store.MEDIA_DIR)
+    os.close(handle)
+    try:
+        edit_list.render(output_path)
+        info = media_index.get(output_path)
+        media_id = media_store.add_file(output_path, content_hash(output_path), ".mp4")
+        media_index.record(media_store.media_path(media_id), info)
+        return media_id
+    finally:
+        if os.path.exists(output_path):
+            os.remove(output_path)
+
+
+class ChatEdits:
+    """The edits made in one chat, kept as an edit list over the original upload.
+
+    Every edit renders the whole list from the untouched source, so chat
+    edits never stack generations of re-encoding on earlier renders.
+    """
+
+    def __init__(self, media_id: str):
+        self.source_id = media_id
+        self.rendered_id = media_id
+        self.edit_list = EditList(media_store.media_path(media_id))
+
+    def covers(self, media_id: str) -> bool:
+        """Return True if media_id is this chat's source or its latest render."""
+        return media_id in (self.source_id, self.rendered_id)
+
+    def apply(self, operation: EditOperation) -> tuple[str, str]:
+        """Record an edit, render the list and return (new media id, summary).
+
+        Raises ValueError if the edit cannot apply. An edit whose render fails
+        is dropped again, so the list always matches the latest render.
+        """
+        before = self.edit_list.state.duration
+        self.edit_list.append(operation)
+        try:
+            self.rendered_id = render_edit_list(self.edit_list)
+        except Exception:
+            self.edit_list.pop()
+            raise
+        summary = describe_edit(
+            self.edit_list.operations[-1], before, self.edit_list.state.duration
+        )
+        return self.rendered_id, summary
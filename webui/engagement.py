@@ -0,0 +1,42 @@
+"""Engagement curve and highlight endpoint for the web player."""
+
+import reflex as rx
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+
+from tools.engagement import SCORE_SIGNAL, engagement_store
+from webui import media_store
+
+ENGAGEMENT_ROUTE = "/engagement"
+MAX_CURVE_POINTS = 2000
+
+
+def engagement_url(media_id: str) -> str:
+    """Return the URL of a media id's engagement curve and highlights."""
+    return f"{rx.config.get_config().api_url}{ENGAGEMENT_ROUTE}/{media_id}"
+
+
+async def serve_engagement(media_id: str, request: Request, points: int = 500) -> Response:
+    """Serve highlight spans and a downsampled engagement curve as JSON.
+
+    Each curve point is the peak score of the seconds it covers, so short
+    spikes stay visible however far the curve is zoomed out.
+    """
+    try:
+        media_store.media_path(media_id)
+    except ValueError:
+        return Response(status_code=404)
+    digest = media_id.split(".")[0]
+    if SCORE_SIGNAL not in engagement_store.signals(digest):
+        return JSONResponse({"step": 1, "curve": [], "highlights": []})
+
+    points = min(max(points, 1), MAX_CURVE_POINTS)
+    step, rows = engagement_store.read(digest, SCORE_SIGNAL, max_points=points)
+    return JSONResponse(
+        {
+            "step": step,
+            "curve": [round(float(value), 3) for value in rows[:, 1]],
+            "highlights": engagement_store.highlights(digest),
+        },
+        headers={"Cache-Control": "no-cache"},
+    )
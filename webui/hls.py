@@ -0,0 +1,122 @@
+"""Adaptive-bitrate HLS packaging of uploads for the web player."""
+
+import mimetypes
+import os
+import shutil
+
+import ffmpeg
+import reflex as rx
+from fastapi import Request
+from fastapi.responses import Response
+
+from tools.media_info import media_index
+from webui import jobs, media_store
+
+HLS_DIR = os.path.join(media_store.MEDIA_DIR, "hls")
+HLS_ROUTE = "/hls"
+HLS_SEGMENT_SECONDS = 2
+# (height, video bitrate, audio bitrate), highest first.
+HLS_LADDER = [(1080, "5000k", "128k"), (720, "2800k", "128k"), (360, "800k", "96k")]
+COMPLETE_MARKER = "complete"
+
+mimetypes.add_type("application/vnd.apple.mpegurl", ".m3u8")
+mimetypes.add_type("video/mp2t", ".ts")
+
+
+def package_dir(media_id: str) -> str:
+    """Return the directory holding a media id's HLS ladder."""
+    media_store.media_path(media_id)  # Validates the id.
+    return os.path.join(HLS_DIR, media_id.split(".")[0])
+
+
+def master_url(media_id: str) -> str:
+    """Return the URL of a media id's master playlist."""
+    return f"{rx.config.get_config().api_url}{HLS_ROUTE}/{media_id}/master.m3u8"
+
+
+def is_packaged(media_id: str) -> bool:
+    """Return True once packaging has started or finished for media_id."""
+    return jobs.is_pending("hls", media_id) or os.path.exists(
+        os.path.join(package_dir(media_id), COMPLETE_MARKER)
+    )
+
+
+def _ladder_for(height: int) -> list[tuple[int, str, str]]:
+    """Drop renditions taller than the source, always keeping the smallest."""
+    ladder = [rung for rung in HLS_LADDER if rung[0] <= height]
+    return ladder or HLS_LADDER[-1:]
+
+
+def build_command(source_path: str, output_dir: str):
+    """Build one ffmpeg command that encodes every rendition and segments it."""
+    info = media_index.get(source_path)
+    ladder = _ladder_for(info.height)
+    source = ffmpeg.input(source_path)
+    videos = source.video.filter_multi_output("split", len(ladder))
+    audios = source.audio.filter_multi_output("asplit", len(ladder)) if info.has_audio else None
+
+    streams, options, stream_map = [], {}, []
+    for index, (height, video_bitrate, audio_bitrate) in enumerate(ladder):
+        streams.append(videos[index].filter("scale", -2, height))
+        options[f"b:v:{index}"] = video_bitrate
+        options[f"maxrate:v:{index}"] = video_bitrate
+        options[f"bufsize:v:{index}"] = f"{2 * int(video_bitrate[:-1])}k"
+        if audios is not None:
+            streams.append(audios[index])
+            options[f"b:a:{index}"] = audio_bitrate
+            stream_map.append(f"v:{index},a:{index},name:{height}p")
+        else:
+            stream_map.append(f"v:{index},name:{height}p")
+
+    return ffmpeg.output(
+        *streams,
+        os.path.join(output_dir, "%v", "index.m3u8"),
+        vcodec="libx264",
+        preset="veryfast",
+        acodec="aac",
+        # Aligned keyframes on every segment boundary let players switch renditions.
+        force_key_frames=f"expr:gte(t,n_forced*{HLS_SEGMENT_SECONDS})",
+        sc_threshold=0,
+        f="hls",
+        hls_time=HLS_SEGMENT_SECONDS,
+        # EVENT playlists are published as segments appear, so playback can
+        # begin while the rest of the stream is still being packaged.
+        hls_playlist_type="event",
+        hls_flags="independent_segments",
+        hls_segment_filename=os.path.join(output_dir, "%v", "seg%05d.ts"),
+        master_pl_name="master.m3u8",
+        var_stream_map=" ".join(stream_map),
+        **options,
+    ).overwrite_output()
+
+
+def _package(media_id: str):
+    output_dir = package_dir(media_id)
+    shutil.rmtree(output_dir, ignore_errors=True)
+    os.makedirs(output_dir)
+    try:
+        build_command(media_store.media_path(media_id), output_dir).run(quiet=True)
+        open(os.path.join(output_dir, COMPLETE_MARKER), "w").close()
+    except ffmpeg.Error as e:
+        stderr = e.stderr.decode() if e.stderr else "Unknown FFmpeg error"
+        print(f"Failed to package {media_id} for HLS: {stderr}")
+
+
+def start_packaging(media_id: str):
+    """Package a stored upload into an HLS ladder on the media job pool."""
+    if not is_packaged(media_id):
+        jobs.submit("hls", media_id, _package)
+
+
+async def serve_hls(media_id: str, asset: str, request: Request) -> Response:
+    """Serve playlists and segments from a media id's HLS ladder."""
+    try:
+        root = os.path.realpath(package_dir(media_id))
+    except ValueError:
+        return Response(status_code=404)
+    path = os.path.realpath(os.path.join(root, asset))
+    if not path.startswith(root + os.sep):
+        return Response(status_code=404)
+    # Playlists grow while packaging runs; finished segments never change.
+    cache_control = "no-cache" if path.endswith(".m3u8") else "public, max-age=31536000, immutable"
+    return media_store.serve_file(path, request, cache_control=cache_control)
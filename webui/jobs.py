@@ -0,0 +1,45 @@
+"""Bounded worker pool for background processing of stored uploads."""
+
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# Each job drives a multi-threaded ffmpeg process, so a few at a time is enough.
+MEDIA_WORKERS = int(os.getenv("CHOPSTICKZ_MEDIA_WORKERS", "2"))
+
+_executor = ThreadPoolExecutor(max_workers=MEDIA_WORKERS, thread_name_prefix="media-job")
+_pending: dict[tuple[str, str], Future] = {}
+_lock = threading.Lock()
+
+
+def is_pending(kind: str, media_id: str) -> bool:
+    """Return True while a job of this kind is queued or running for media_id."""
+    with _lock:
+        return (kind, media_id) in _pending
+
+
+def _run(kind: str, media_id: str, job):
+    try:
+        job(media_id)
+    except Exception as e:
+        print(f"Failed to run {kind} for {media_id}: {type(e).__name__}: {e}")
+    finally:
+        with _lock:
+            _pending.pop((kind, media_id), None)
+
+
+def submit(kind: str, media_id: str, job) -> bool:
+    """Queue job(media_id) unless one of the same kind is pending; return whether queued."""
+    with _lock:
+        if (kind, media_id) in _pending:
+            return False
+        _pending[kind, media_id] = _executor.submit(_run, kind, media_id, job)
+    return True
+
+
+def cancel(media_id: str):
+    """Drop every job for media_id that has not started yet; running jobs finish."""
+    with _lock:
+        for key, future in list(_pending.items()):
+            if key[1] == media_id and future.cancel():
+                del _pending[key]
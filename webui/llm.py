@@ -0,0 +1,356 @@
+"""Non-blocking LLM providers over pooled keep-alive HTTP connections.
+
+Each provider owns one ``httpx.AsyncClient`` and a semaphore limiting how
+many requests it has in flight. Base URLs come from the environment, so a
+local stub server can stand in for either API.
+"""
+
+import abc
+import asyncio
+import hashlib
+import json
+import os
+import random
+import tempfile
+import time
+from dataclasses import dataclass
+
+import httpx
+
+OPENAI_API_BASE = os.getenv("OPENAI_API_BASE", "https://api.openai.com/v1")
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4")
+BAIDU_API_BASE = os.getenv("BAIDU_API_BASE", "https://aip.baidubce.com")
+BAIDU_CHAT_PATH = "/rpc/2.0/ai_custom/v1/wenxinworkshop/chat/completions_pro"
+LLM_CONCURRENCY = int(os.getenv("CHOPSTICKZ_LLM_CONCURRENCY", "8"))
+LLM_TIMEOUT_SECONDS = 60.0
+LLM_CONNECT_TIMEOUT_SECONDS = 10.0
+LLM_RETRIES = 3
+LLM_BACKOFF_SECONDS = 0.5
+RETRY_STATUS_CODES = (408, 429, 500, 502, 503, 504)
+# Credentials live in the user's own cache directory, not the shared temp dir.
+CACHE_DIR = os.path.join(
+    os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "chopstickz"
+)
+BAIDU_TOKEN_PATH = os.path.join(CACHE_DIR, "baidu-token.json")
+# Refresh this long before expiry, capped at a tenth of the token's lifetime.
+TOKEN_REFRESH_MARGIN_SECONDS = 24 * 3600
+# Baidu error codes meaning the access token is invalid or has expired.
+BAIDU_TOKEN_ERROR_CODES = (110, 111)
+
+
+class LLMError(Exception):
+    """An LLM request failed after every retry."""
+
+
+@dataclass
+class ProviderUsage:
+    """Counters for one provider, for measuring load and latency."""
+
+    requests: int = 0
+    retries: int = 0
+    failures: int = 0
+    in_flight: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    first_token_seconds: float = 0.0
+
+    @property
+    def mean_first_token_seconds(self) -> float:
+        """Average time from sending a request to its first answer text."""
+        completed = self.requests - self.failures
+        return self.first_token_seconds / completed if completed else 0.0
+
+
+class AccessTokenCache:
+    """Process-wide cache of an expiring credential, persisted across restarts.
+
+    A token is served from memory until it nears expiry. Inside the refresh
+    margin it is still served while one background refresh runs, and every
+    caller that needs a fresh token awaits the same in-flight fetch.
+    """
+
+    def __init__(self, fetch, cache_path: str, identity: str = ""):
+        self.fetch = fetch
+        self.cache_path = cache_path
+        # Ties the on-disk copy to the credentials it was issued for.
+        self.identity = hashlib.sha256(identity.encode()).hexdigest()
+        self.token = None
+        self.expires_at = 0.0
+        self.refresh_at = 0.0
+        self._refresh = None
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.cache_path) as cache_file:
+                data = json.load(cache_file)
+        except (OSError, ValueError):
+            return
+        if data.get("identity") == self.identity and data.get("expires_at", 0) > time.time():
+            self._set(data["token"], data["expires_at"], data.get("refresh_at"))
+
+    def _set(self, token: str, expires_at: float, refresh_at: float = None):
+        self.token, self.expires_at = token, expires_at
+        self.refresh_at = refresh_at or expires_at - TOKEN_REFRESH_MARGIN_SECONDS
+
+    def _save(self):
+        data = {
+            "identity": self.identity,
+            "token": self.token,
+            "expires_at": self.expires_at,
+            "refresh_at": self.refresh_at,
+        }
+        cache_dir = os.path.dirname(self.cache_path)
+        os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+        # mkstemp creates an unpredictable name exclusively, readable only by us.
+        descriptor, partial_path = tempfile.mkstemp(suffix=".tmp", dir=cache_dir)
+        try:
+            with os.fdopen(descriptor, "w") as partial_file:
+                json.dump(data, partial_file)
+            os.replace(partial_path, self.cache_path)
+        except OSError:
+            os.remove(partial_path)
+            raise
+
+    async def _fetch(self):
+        try:
+            token, expires_in = await self.fetch()
+            now = time.time()
+            margin = min(TOKEN_REFRESH_MARGIN_SECONDS, expires_in / 10)
+            self._set(token, now + expires_in, now + expires_in - margin)
+            try:
+                self._save()
+            except OSError as e:
+                print(f"Failed to save the access token cache: {e}")
+            return token
+        finally:
+            self._refresh = None
+
+    def _start_refresh(self) -> asyncio.Future:
+        if self._refresh is None:
+            self._refresh = asyncio.ensure_future(self._fetch())
+            self._refresh.add_done_callback(self._refresh_done)
+        return self._refresh
+
+    @staticmethod
+    def _refresh_done(future: asyncio.Future):
+        # Background refreshes have no awaiting caller to see their errors.
+        if not future.cancelled() and future.exception() is not None:
+            print(f"Failed to refresh the access token: {future.exception()}")
+
+    async def get(self) -> str:
+        """Return a valid token, fetching one only when none is cached."""
+        now = time.time()
+        if self.token is not None and now < self.expires_at:
+            if now >= self.refresh_at:
+                self._start_refresh()
+            return self.token
+        return await asyncio.shield(self._start_refresh())
+
+    def invalidate(self):
+        """Forget a token the server rejected so the next get fetches another."""
+        self.token = None
+        self.expires_at = self.refresh_at = 0.0
+
+
+class Provider(abc.ABC):
+    """Base class for chat providers that stream answer text asynchronously."""
+
+    name = ""
+
+    def __init__(self, base_url: str, concurrency: int = LLM_CONCURRENCY,
+                 timeout: float = LLM_TIMEOUT_SECONDS, retries: int = LLM_RETRIES,
+                 backoff: float = LLM_BACKOFF_SECONDS,
+                 transport: httpx.AsyncBaseTransport = None):
+        self.base_url = base_url
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.transport = transport
+        self.usage = ProviderUsage()
+        self._client = None
+        self._semaphore = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Shared client whose connection pool is sized to the concurrency limit."""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(self.timeout, connect=LLM_CONNECT_TIMEOUT_SECONDS),
+                limits=httpx.Limits(
+                    max_connections=self.concurrency, max_keepalive_connections=self.concurrency
+                ),
+                transport=self.transport,
+            )
+        return self._client
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        """Limit on this provider's requests in flight."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._semaphore
+
+    async def _send(self, request: httpx.Request, stream: bool = False) -> httpx.Response:
+        """Send a request, retrying transport errors and retryable statuses with backoff."""
+        for attempt in range(self.retries + 1):
+            try:
+                response = await self.client.send(request, stream=stream)
+            except httpx.TransportError as e:
+                error = f"{type(e).__name__}: {e}"
+            else:
+                if response.status_code < 400:
+                    return response
+                body = (await response.aread()).decode(errors="replace")
+                await response.aclose()
+                error = f"HTTP {response.status_code}: {body[:500]}"
+                if response.status_code not in RETRY_STATUS_CODES:
+                    break
+            if attempt < self.retries:
+                self.usage.retries += 1
+                await asyncio.sleep(self.backoff * 2**attempt * (1 + random.random()))
+        raise LLMError(f"{self.name} request failed: {error}")
+
+    @abc.abstractmethod
+    def _chat(self, messages: list[dict[str, str]]):
+        """Return an async iterator of answer text; implemented by each provider."""
+
+    async def stream(self, messages: list[dict[str, str]]):
+        """Yield answer text as it arrives, within the provider's concurrency limit."""
+        async with self.semaphore:
+            self.usage.requests += 1
+            self.usage.in_flight += 1
+            started = time.monotonic()
+            first = True
+            try:
+                async for text in self._chat(messages):
+                    if first:
+                        self.usage.first_token_seconds += time.monotonic() - started
+                        first = False
+                    yield text
+            except (LLMError, httpx.HTTPError, ValueError):
+                self.usage.failures += 1
+                raise
+            finally:
+                self.usage.in_flight -= 1
+
+    async def aclose(self):
+        """Close pooled connections."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class OpenAIProvider(Provider):
+    """OpenAI-compatible chat completions streamed as server-sent events."""
+
+    name = "openai"
+
+    def __init__(self, base_url: str = OPENAI_API_BASE, api_key: str = None,
+                 model: str = OPENAI_MODEL, **kwargs):
+        super().__init__(base_url, **kwargs)
+        self.api_key = api_key if api_key is not None else os.getenv("OPENAI_API_KEY", "")
+        self.model = model
+
+    async def _chat(self, messages: list[dict[str, str]]):
+        request = self.client.build_request(
+            "POST",
+            "/chat/completions",
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            json={
+                "model": self.model,
+                "messages": messages,
+                "stream": True,
+                # Streams only report token usage, in a final chunk, when asked.
+                "stream_options": {"include_usage": True},
+            },
+        )
+        response = await self._send(request, stream=True)
+        try:
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                chunk = json.loads(data)
+                usage = chunk.get("usage")
+                if usage:
+                    self.usage.prompt_tokens += usage.get("prompt_tokens", 0)
+                    self.usage.completion_tokens += usage.get("completion_tokens", 0)
+                for choice in chunk.get("choices", []):
+                    text = choice.get("delta", {}).get("content")
+                    if text:
+                        yield text
+        finally:
+            await response.aclose()
+
+
+class BaiduProvider(Provider):
+    """Baidu ERNIE chat completions, returned as a single answer."""
+
+    name = "baidu"
+
+    def __init__(self, base_url: str = BAIDU_API_BASE, api_key: str = None,
+                 secret_key: str = None, **kwargs):
+        super().__init__(base_url, **kwargs)
+        self.api_key = api_key if api_key is not None else os.getenv("BAIDU_API_KEY")
+        self.secret_key = secret_key if secret_key is not None else os.getenv("BAIDU_SECRET_KEY")
+        self.tokens = AccessTokenCache(
+            self._fetch_access_token, BAIDU_TOKEN_PATH, f"{self.api_key}:{self.secret_key}"
+        )
+
+    async def _fetch_access_token(self) -> tuple[str, float]:
+        """Request a new OAuth access token and its lifetime in seconds."""
+        request = self.client.build_request(
+            "POST",
+            "/oauth/2.0/token",
+            params={
+                "grant_type": "client_credentials",
+                "client_id": self.api_key,
+                "client_secret": self.secret_key,
+            },
+        )
+        data = (await self._send(request)).json()
+        if "access_token" not in data:
+            raise LLMError(f"baidu token request failed: {data.get('error_description', data)}")
+        return str(data["access_token"]), float(data.get("expires_in", 3600))
+
+    async def _chat(self, messages: list[dict[str, str]]):
+        # ERNIE takes system text as a separate field rather than a message.
+        payload = {"messages": [m for m in messages if m["role"] != "system"]}
+        system = "\n\n".join(m["content"] for m in messages if m["role"] == "system")
+        if system:
+            payload["system"] = system
+        for attempt in range(2):
+            request = self.client.build_request(
+                "POST",
+                BAIDU_CHAT_PATH,
+                params={"access_token": await self.tokens.get()},
+                json=payload,
+            )
+            data = (await self._send(request)).json()
+            if data.get("error_code") not in BAIDU_TOKEN_ERROR_CODES or attempt:
+                break
+            # The cached token was revoked early; fetch a new one and retry once.
+            self.tokens.invalidate()
+        if "error_code" in data:
+            raise LLMError(f"baidu request failed: {data.get('error_msg', data['error_code'])}")
+        usage = data.get("usage", {})
+        self.usage.prompt_tokens += usage.get("prompt_tokens", 0)
+        self.usage.completion_tokens += usage.get("completion_tokens", 0)
+        if data.get("result"):
+            yield data["result"]
+
+
+_providers: dict[str, Provider] = {}
+
+
+def get_provider(name: str) -> Provider:
+    """Return the process-wide provider for name, creating it on first use."""
+    if name not in _providers:
+        provider_class = {"openai": OpenAIProvider, "baidu": BaiduProvider}[name]
+        _providers[name] = provider_class()
+    return _providers[name]
@@ -0,0 +1,136 @@
+"""Content-addressed media store served with HTTP range and conditional requests."""
+
+import mimetypes
+import os
+import re
+import shutil
+from email.utils import formatdate, parsedate_to_datetime
+
+import reflex as rx
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+
+MEDIA_DIR = os.getenv("CHOPSTICKZ_MEDIA_DIR", os.path.join(os.getcwd(), "media"))
+MEDIA_ROUTE = "/media"
+STREAM_CHUNK_BYTES = 1024 * 1024
+MEDIA_ID_PATTERN = re.compile(r"^[0-9a-f]{64}(\.[A-Za-z0-9]{1,8})?$")
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def media_path(media_id: str) -> str:
+    """Return the on-disk path of a media id, rejecting anything not content-addressed."""
+    if not MEDIA_ID_PATTERN.match(media_id):
+        raise ValueError(f"Invalid media id: {media_id}")
+    return os.path.join(MEDIA_DIR, media_id[:2], media_id)
+
+
+def add_file(path: str, content_hash: str, extension: str = "") -> str:
+    """Move a file into the store under its content hash and return its media id.
+
+    If the same content is already stored, the new copy is discarded. An
+    extension that a media id cannot carry, such as ".2024-01-01", is dropped.
+    """
+    media_id = f"{content_hash}{extension.lower()}"
+    if not MEDIA_ID_PATTERN.match(media_id):
+        media_id = content_hash
+    target = media_path(media_id)
+    if os.path.exists(target):
+        os.remove(path)
+    else:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.move(path, target)
+    return media_id
+
+
+def media_url(media_id: str) -> str:
+    """Return the backend URL that serves a media id."""
+    return f"{rx.config.get_config().api_url}{MEDIA_ROUTE}/{media_id}"
+
+
+def _file_chunks(path: str, start: int, length: int):
+    """Yield length bytes of path from offset start in bounded chunks."""
+    with open(path, "rb") as media_file:
+        media_file.seek(start)
+        while length > 0:
+            chunk = media_file.read(min(STREAM_CHUNK_BYTES, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _not_modified(request: Request, etag: str, mtime: float) -> bool:
+    """Evaluate If-None-Match, falling back to If-Modified-Since."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match == "*"
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def serve_file(path: str, request: Request, etag: str = None,
+               cache_control: str = "no-cache") -> Response:
+    """Serve a file, honouring single byte ranges and conditional headers."""
+    if not os.path.isfile(path):
+        return Response(status_code=404)
+
+    stat = os.stat(path)
+    size = stat.st_size
+    etag = etag or f'"{stat.st_mtime_ns:x}-{size:x}"'
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+        "Cache-Control": cache_control,
+    }
+    if _not_modified(request, etag, stat.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    start, end = 0, size - 1
+    status_code = 200
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range == etag):
+        match = RANGE_PATTERN.match(range_header.strip())
+        if match is None or match.groups() == ("", ""):
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+        first, last = match.groups()
+        if first:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+        else:
+            start = max(size - int(last), 0)
+        if start > end or start >= size:
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    length = end - start + 1
+    headers["Content-Length"] = str(length)
+    if request.method == "HEAD":
+        return Response(status_code=status_code, headers=headers, media_type=media_type)
+    return StreamingResponse(
+        _file_chunks(path, start, length),
+        status_code=status_code,
+        headers=headers,
+        media_type=media_type,
+    )
+
+
+async def serve_media(media_id: str, request: Request) -> Response:
+    """Serve a stored file by media id."""
+    try:
+        path = media_path(media_id)
+    except ValueError:
+        return Response(status_code=404)
+    # Content never changes under a media id, so the id itself is a strong validator.
+    return serve_file(
+        path, request, etag=f'"{media_id}"', cache_control="public, max-age=31536000, immutable"
+    )
@@ -1,28 +1,50 @@
 """Application state management for the Chopstickz web interface."""
 
+import asyncio
 import json
 import os
+import time
 
-import openai
+import ffmpeg
+import httpx
 import reflex as rx
-import requests
 
-openai.api_key = os.getenv("OPENAI_API_KEY", "")
-openai.api_base = os.getenv("OPENAI_API_BASE", "https://api.openai.com/v1")
+from tools.commands import compile_command
+from webui import jobs
+from webui.analysis import start_analysis
+from webui.context import ChatContext
+from webui.edits import ChatEdits
+from webui.hls import start_packaging
+from webui.llm import LLMError, get_provider
+from webui.media_store import media_path
+from webui.thumbnails import start_thumbnails
+from webui.uploads import UPLOAD_ROUTE
 
 BAIDU_API_KEY = os.getenv("BAIDU_API_KEY")
-BAIDU_SECRET_KEY = os.getenv("BAIDU_SECRET_KEY")
 
+# Streamed deltas are sent to the browser at most this often or once this many
+# characters have accumulated, whichever comes first.
+STREAM_FLUSH_SECONDS = 0.05
+STREAM_FLUSH_CHARS = 64
+# Compiled actions the web player offers; other non-edit phrases, such as
+# undo or export, still go to the LLM.
+PLAYER_ACTIONS = ("play", "pause", "step", "seek")
+SYSTEM_PROMPT = (
+    "You are a friendly chatbot named prod.ai, a language powered video editing tool "
+    "to simplify content creation."
+)
 
-def get_baidu_access_token() -> str:
-    """Get Baidu API access token."""
-    url = "https://aip.baidubce.com/oauth/2.0/token"
-    params = {
-        "grant_type": "client_credentials",
-        "client_id": BAIDU_API_KEY,
-        "client_secret": BAIDU_SECRET_KEY,
-    }
-    return str(requests.post(url, params=params).json().get("access_token"))
+
+def ingest(media_id: str, derived: bool = False):
+    """Start the background jobs that prepare a stored video for the player.
+
+    Renders derived from an upload by chat edits skip content analysis,
+    which only feeds highlights of the original stream.
+    """
+    start_packaging(media_id)
+    start_thumbnails(media_id)
+    if not derived:
+        start_analysis(media_id)
 
 
 class QA(rx.Base):
@@ -49,23 +71,43 @@ class State(rx.State):
     modal_open: bool = False
     api_type: str = "baidu" if BAIDU_API_KEY else "openai"
     video_segments: list[str] = []
+    uploading: bool = False
+    pending_question: str = ""
+    streaming_answer: str = ""
+    # Backend-only prompt context of each chat, maintained as turns complete.
+    _contexts: dict[str, ChatContext] = {}
+    # Backend-only edit list of each chat, always over the original upload.
+    _edits: dict[str, ChatEdits] = {}
+
+    def start_upload(self):
+        """Stream the selected files to the upload route from the browser."""
+        self.uploading = True
+        upload_url = f"{rx.config.get_config().api_url}{UPLOAD_ROUTE}"
+        return rx.call_script(
+            f"uploadSelectedFiles({json.dumps(upload_url)})", callback=State.finish_upload
+        )
 
-    async def handle_upload(self, files: list[rx.UploadFile]):
-        """Handle video file upload."""
-        for file in files:
-            upload_data = await file.read()
-            assets_dir = os.path.join(os.getcwd(), "assets")
-            outfile = os.path.join(assets_dir, file.filename)
-
-            with open(outfile, "wb") as file_object:
-                file_object.write(upload_data)
-
-            self.video_segments.append(file.filename)
+    def finish_upload(self, result: dict):
+        """Prepare the uploaded media for the player once the browser is done."""
+        self.uploading = False
+        for media_id in result.get("media_ids", []):
+            try:
+                if not os.path.exists(media_path(media_id)):
+                    continue
+            except ValueError:
+                continue
+            ingest(media_id)
+            if media_id not in self.video_segments:
+                self.video_segments.append(media_id)
+        if result.get("error"):
+            print(f"Failed to upload: {result['error']}")
 
     def create_chat(self):
         """Create a new chat session."""
         self.current_chat = self.new_chat_name
         self.chats[self.new_chat_name] = []
+        self._contexts.pop(self.new_chat_name, None)
+        self._edits.pop(self.new_chat_name, None)
         self.modal_open = False
 
     def toggle_modal(self):
@@ -79,6 +121,8 @@ class State(rx.State):
     def delete_chat(self):
         """Delete the current chat session."""
         del self.chats[self.current_chat]
+        self._contexts.pop(self.current_chat, None)
+        self._edits.pop(self.current_chat, None)
         if len(self.chats) == 0:
             self.chats = DEFAULT_CHATS
         self.current_chat = list(self.chats.keys())[0]
@@ -94,81 +138,115 @@ class State(rx.State):
         """Get the list of chat titles."""
         return list(self.chats.keys())
 
+    def _start_answer(self, question: str) -> str:
+        """Show a question as pending and return the chat it belongs to."""
+        self.pending_question = question
+        self.streaming_answer = ""
+        self.processing = True
+        return self.current_chat
+
+    def _context(self, chat_name: str) -> ChatContext:
+        """Return the prompt context of a chat, seeding it from history on first use."""
+        if chat_name not in self._contexts:
+            context = ChatContext()
+            for qa in self.chats.get(chat_name, []):
+                context.add_turn(qa.question, qa.answer)
+            self._contexts[chat_name] = context
+        return self._contexts[chat_name]
+
+    def _commit_answer(self, chat_name: str, question: str, answer: str):
+        """Add a finished answer to the chat history in a single update."""
+        self._context(chat_name).add_turn(question, answer)
+        self.chats.setdefault(chat_name, []).append(QA(question=question, answer=answer))
+        self.chats = self.chats
+        self.pending_question = ""
+        self.streaming_answer = ""
+        self.processing = False
+
     async def process_question(self, form_data: dict[str, str]):
         """Process a user question through the appropriate API."""
         question = form_data["question"]
         if question == "":
             return
 
-        if self.api_type == "openai":
-            model = self.openai_process_question
-        else:
-            model = self.baidu_process_question
+        # Known edit phrases compile locally; only the rest goes to the LLM.
+        try:
+            command = compile_command(question)
+        except ValueError as e:
+            self._commit_answer(self.current_chat, question, f"{e} Please try again.")
+            return
+        if command is not None and command.operation is not None:
+            async for value in self.edit_process_question(question, command.operation):
+                yield value
+            return
+        if command is not None and command.action in PLAYER_ACTIONS:
+            answer = f'"{question}" is a player control; use the video player for it.'
+            self._commit_answer(self.current_chat, question, answer)
+            return
 
-        async for value in model(question):
+        async for value in self.llm_process_question(question):
             yield value
 
-    async def openai_process_question(self, question: str):
-        """Process question using OpenAI API."""
-        qa = QA(question=question, answer="")
-        self.chats[self.current_chat].append(qa)
-        self.processing = True
+    async def edit_process_question(self, question: str, operation):
+        """Apply an edit command to the current upload and report the result."""
+        chat_name = self._start_answer(question)
         yield
 
-        messages = [
-            {
-                "role": "system",
-                "content": "You are a friendly chatbot named prod.ai, a language powered video editing tool to simplify content creation.",
-            }
-        ]
-        for qa in self.chats[self.current_chat]:
-            messages.append({"role": "user", "content": qa.question})
-            messages.append({"role": "assistant", "content": qa.answer})
-
-        messages = messages[:-1]
-
-        session = openai.ChatCompletion.create(
-            model=os.getenv("OPENAI_MODEL", "gpt-4"),
-            messages=messages,
-            stream=True,
-        )
-
-        for item in session:
-            if hasattr(item.choices[0].delta, "content"):
-                answer_text = item.choices[0].delta.content
-                self.chats[self.current_chat][-1].answer += answer_text
-                self.chats = self.chats
-                yield
-
-        self.processing = False
-
-    async def baidu_process_question(self, question: str):
-        """Process question using Baidu API."""
-        qa = QA(question=question, answer="")
-        self.chats[self.current_chat].append(qa)
-        self.processing = True
+        if not self.video_segments:
+            answer = "Upload a stream first, then tell me how to edit it."
+        else:
+            try:
+                edits = self._edits.get(chat_name)
+                if edits is None or not edits.covers(self.video_segments[0]):
+                    edits = await asyncio.to_thread(ChatEdits, self.video_segments[0])
+                    self._edits[chat_name] = edits
+                previous_id = edits.rendered_id
+                media_id, answer = await asyncio.to_thread(edits.apply, operation)
+                superseded = {media_id}
+                if previous_id not in (edits.source_id, media_id):
+                    # Nobody will watch the previous render, so drop its queued
+                    # jobs rather than let them delay the new one's.
+                    jobs.cancel(previous_id)
+                    superseded.add(previous_id)
+                ingest(media_id, derived=True)
+                self.video_segments = [media_id] + [
+                    segment for segment in self.video_segments if segment not in superseded
+                ]
+            except ValueError as e:
+                answer = f"Error: {e}"
+            except ffmpeg.Error as e:
+                stderr = e.stderr.decode() if e.stderr else "Unknown FFmpeg error"
+                answer = f"Failed to edit the video: {stderr}"
+            except Exception as e:
+                # Probing and storing the render can fail outside ffmpeg too; the
+                # pending answer must still be committed.
+                answer = f"Failed to edit the video: {type(e).__name__}: {e}"
+
+        self._commit_answer(chat_name, question, answer)
+
+    async def llm_process_question(self, question: str):
+        """Answer a question with the selected LLM provider.
+
+        Deltas are buffered and flushed into streaming_answer on a time or
+        size budget, so each update sends only that small var; the answer
+        joins the chat history once the stream ends.
+        """
+        chat_name = self._start_answer(question)
         yield
 
-        messages = []
-        for qa in self.chats[self.current_chat]:
-            messages.append({"role": "user", "content": qa.question})
-            messages.append({"role": "assistant", "content": qa.answer})
-
-        messages_json = json.dumps({"messages": messages[:-1]})
-
-        session = requests.request(
-            "POST",
-            "https://aip.baidubce.com/rpc/2.0/ai_custom/v1/wenxinworkshop/chat/completions_pro?access_token="
-            + get_baidu_access_token(),
-            headers={"Content-Type": "application/json"},
-            data=messages_json,
-        )
-
-        json_data = json.loads(session.text)
-        if "result" in json_data.keys():
-            answer_text = json_data["result"]
-            self.chats[self.current_chat][-1].answer += answer_text
-            self.chats = self.chats
-            yield
-
-        self.processing = False
+        messages = self._context(chat_name).messages(question, SYSTEM_PROMPT)
+        buffer = ""
+        last_flush = time.monotonic()
+        try:
+            async for text in get_provider(self.api_type).stream(messages):
+                buffer += text
+                now = time.monotonic()
+                if len(buffer) >= STREAM_FLUSH_CHARS or now - last_flush >= STREAM_FLUSH_SECONDS:
+                    self.streaming_answer += buffer
+                    buffer = ""
+                    last_flush = now
+                    yield
+        except (LLMError, httpx.HTTPError, ValueError) as e:
+            buffer += f"\n\nError: {e}"
+
+        self._commit_answer(chat_name, question, self.streaming_answer + buffer)
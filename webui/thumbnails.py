@@ -0,0 +1,108 @@
+"""Thumbnail sprite sheets and a seek-preview index for the player's seek bar."""
+
+import json
+import os
+import shutil
+import tempfile
+
+import ffmpeg
+import reflex as rx
+from fastapi import Request
+from fastapi.responses import Response
+
+from tools.media_info import media_index
+from webui import jobs, media_store
+
+THUMBS_DIR = os.path.join(media_store.MEDIA_DIR, "thumbs")
+THUMBS_ROUTE = "/thumbs"
+THUMB_INTERVAL_SECONDS = 5
+THUMB_WIDTH = 160
+SHEET_COLUMNS = 10
+SHEET_ROWS = 10
+INDEX_NAME = "index.json"
+
+
+def thumbs_dir(media_id: str) -> str:
+    """Return the directory holding a media id's sprite sheets."""
+    media_store.media_path(media_id)  # Validates the id.
+    return os.path.join(THUMBS_DIR, media_id.split(".")[0])
+
+
+def index_url(media_id: str) -> str:
+    """Return the URL of a media id's seek-preview index."""
+    return f"{rx.config.get_config().api_url}{THUMBS_ROUTE}/{media_id}/{INDEX_NAME}"
+
+
+def has_thumbnails(media_id: str) -> bool:
+    """Return True once the seek-preview index has been written."""
+    return os.path.exists(os.path.join(thumbs_dir(media_id), INDEX_NAME))
+
+
+def generate_sprites(source_path: str, output_dir: str) -> dict:
+    """Sample, downscale and tile frames into sprite sheets, returning the index.
+
+    When every GOP is shorter than the thumbnail interval only keyframes are
+    decoded, which costs a small fraction of a full decode; with longer GOPs
+    that would repeat stale keyframes, so every frame is decoded instead.
+    Frames are scaled after decoding. A thumbnail's sheet and position follow
+    from its timestamp: ``n = t // interval``, sheet ``n // (columns * rows)``,
+    column ``n % columns`` and row ``n // columns % rows``.
+    """
+    info = media_index.get(source_path, keyframes=True)
+    height = max(2, round(THUMB_WIDTH * info.height / info.width / 2) * 2)
+    input_options = {}
+    if info.gop_seconds <= THUMB_INTERVAL_SECONDS:
+        input_options["skip_frame"] = "nokey"
+    (
+        ffmpeg.input(source_path, **input_options)
+        .filter("fps", f"1/{THUMB_INTERVAL_SECONDS}")
+        .filter("scale", THUMB_WIDTH, height)
+        .filter("tile", f"{SHEET_COLUMNS}x{SHEET_ROWS}")
+        .output(os.path.join(output_dir, "sheet%03d.jpg"), vsync="vfr", qscale=5)
+        .overwrite_output()
+        .run(quiet=True)
+    )
+    sheets = sorted(name for name in os.listdir(output_dir) if name.startswith("sheet"))
+    return {
+        "interval": THUMB_INTERVAL_SECONDS,
+        "width": THUMB_WIDTH,
+        "height": height,
+        "columns": SHEET_COLUMNS,
+        "rows": SHEET_ROWS,
+        "count": int(info.duration // THUMB_INTERVAL_SECONDS) + 1,
+        "sheets": sheets,
+    }
+
+
+def _generate(media_id: str):
+    output_dir = thumbs_dir(media_id)
+    shutil.rmtree(output_dir, ignore_errors=True)
+    os.makedirs(output_dir)
+    try:
+        index = generate_sprites(media_store.media_path(media_id), output_dir)
+        # The index marks the sheets as ready, so it must never appear half-written.
+        handle, partial_path = tempfile.mkstemp(suffix=".tmp", dir=output_dir)
+        with os.fdopen(handle, "w") as index_file:
+            json.dump(index, index_file, separators=(",", ":"))
+        os.replace(partial_path, os.path.join(output_dir, INDEX_NAME))
+    except ffmpeg.Error as e:
+        stderr = e.stderr.decode() if e.stderr else "Unknown FFmpeg error"
+        print(f"Failed to generate thumbnails for {media_id}: {stderr}")
+
+
+def start_thumbnails(media_id: str):
+    """Generate sprite sheets for a stored upload on the media job pool."""
+    if not has_thumbnails(media_id):
+        jobs.submit("thumbnails", media_id, _generate)
+
+
+async def serve_thumbnails(media_id: str, asset: str, request: Request) -> Response:
+    """Serve the index and sprite sheets of a media id."""
+    try:
+        root = os.path.realpath(thumbs_dir(media_id))
+    except ValueError:
+        return Response(status_code=404)
+    path = os.path.realpath(os.path.join(root, asset))
+    if not path.startswith(root + os.sep):
+        return Response(status_code=404)
+    return media_store.serve_file(path, request, cache_control="public, max-age=86400")
@@ -0,0 +1,103 @@
+"""Resumable uploads streamed straight from the request body to a partial file."""
+
+import asyncio
+import os
+import re
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+from starlette.requests import ClientDisconnect
+
+from tools.render_cache import content_hash
+from webui import media_store
+
+UPLOAD_ROUTE = "/upload"
+UPLOAD_CHUNK_BYTES = 4 * 1024 * 1024
+PARTIAL_DIR = os.path.join(media_store.MEDIA_DIR, "partial")
+UPLOAD_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{16,64}$")
+CONTENT_RANGE_PATTERN = re.compile(r"^bytes (\d+)-(\d+)/(\d+)$")
+
+# Upload ids with a request in flight, so two requests never append to one file.
+_receiving: set[str] = set()
+
+
+def partial_path(upload_id: str) -> str:
+    """Return the partial file of an upload id, rejecting malformed ids."""
+    if not UPLOAD_ID_PATTERN.match(upload_id):
+        raise ValueError(f"Invalid upload id: {upload_id}")
+    return os.path.join(PARTIAL_DIR, f"{upload_id}.part")
+
+
+def _received(path: str) -> int:
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+def finish_upload(path: str, filename: str) -> str:
+    """Hash a completed partial file, move it into the media store and return its media id."""
+    extension = os.path.splitext(os.path.basename(filename))[1]
+    return media_store.add_file(path, content_hash(path), extension)
+
+
+async def upload_offset(upload_id: str) -> Response:
+    """Report how many bytes of an upload are already stored, so a client can resume."""
+    try:
+        path = partial_path(upload_id)
+    except ValueError:
+        return Response(status_code=404)
+    return JSONResponse({"offset": _received(path)})
+
+
+async def receive_upload(upload_id: str, request: Request) -> Response:
+    """Append one byte range of an upload, streaming the body to disk as it arrives.
+
+    The client sends ``Content-Range: bytes start-end/total`` with start equal
+    to the stored offset, so a resumed upload only sends the missing bytes.
+    A mismatched start is answered with 409 and the offset to resume from.
+    The request that completes the file returns its media id.
+    """
+    try:
+        path = partial_path(upload_id)
+    except ValueError:
+        return Response(status_code=404)
+    match = CONTENT_RANGE_PATTERN.match(request.headers.get("content-range", ""))
+    if match is None:
+        return Response(status_code=400)
+    start, end, total = (int(value) for value in match.groups())
+    if upload_id in _receiving:
+        return JSONResponse({"offset": _received(path)}, status_code=409)
+
+    _receiving.add(upload_id)
+    try:
+        os.makedirs(PARTIAL_DIR, exist_ok=True)
+        offset = _received(path)
+        if offset > total:
+            # Left over from different content under the same id; start again.
+            os.remove(path)
+            offset = 0
+        if start != offset or end < start or end >= total:
+            return JSONResponse({"offset": offset}, status_code=409)
+
+        with open(path, "ab") as partial_file:
+            buffer = bytearray()
+            try:
+                async for chunk in request.stream():
+                    buffer += chunk
+                    if len(buffer) >= UPLOAD_CHUNK_BYTES:
+                        await asyncio.to_thread(partial_file.write, bytes(buffer))
+                        buffer.clear()
+            except ClientDisconnect:
+                pass
+            # Whatever arrived before a disconnect is kept for the next attempt.
+            await asyncio.to_thread(partial_file.write, bytes(buffer))
+
+        offset = _received(path)
+        if offset < total:
+            return JSONResponse({"offset": offset})
+        if offset > total:
+            os.remove(path)
+            return JSONResponse({"offset": 0}, status_code=409)
+        filename = request.query_params.get("filename", "")
+        media_id = await asyncio.to_thread(finish_upload, path, filename)
+        return JSONResponse({"offset": offset, "media_id": media_id})
+    finally:
+        _receiving.discard(upload_id)
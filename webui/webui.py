@@ -4,14 +4,21 @@ import reflex as rx
 
 from webui import styles
 from webui.components import chat, modal, navbar, sidebar, videodisplay
+from webui.engagement import ENGAGEMENT_ROUTE, serve_engagement
+from webui.hls import HLS_ROUTE, serve_hls
+from webui.media_store import MEDIA_ROUTE, serve_media
 from webui.state import State
+from webui.thumbnails import THUMBS_ROUTE, serve_thumbnails
+from webui.uploads import UPLOAD_ROUTE, receive_upload, upload_offset
 
 
 @rx.page(title="prod.ai")
 def index() -> rx.Component:
     """Render the main application page."""
     return rx.chakra.vstack(
+        rx.script(src="https://cdn.jsdelivr.net/npm/hls.js@1"),
         rx.script(src="/custom_video_controls.js"),
+        rx.script(src="/stream_upload.js"),
         navbar(),
         rx.chakra.hstack(
             rx.scroll_area(
@@ -55,3 +62,13 @@ def index() -> rx.Component:
 
 app = rx.App(style=styles.base_style)
 app.add_page(index)
+app.api.add_api_route(f"{MEDIA_ROUTE}/{{media_id}}", serve_media, methods=["GET", "HEAD"])
+app.api.add_api_route(
+    f"{HLS_ROUTE}/{{media_id}}/{{asset:path}}", serve_hls, methods=["GET", "HEAD"]
+)
+app.api.add_api_route(
+    f"{THUMBS_ROUTE}/{{media_id}}/{{asset:path}}", serve_thumbnails, methods=["GET", "HEAD"]
+)
+app.api.add_api_route(f"{ENGAGEMENT_ROUTE}/{{media_id}}", serve_engagement, methods=["GET"])
+app.api.add_api_route(f"{UPLOAD_ROUTE}/{{upload_id}}", upload_offset, methods=["GET"])
+app.api.add_api_route(f"{UPLOAD_ROUTE}/{{upload_id}}", receive_upload, methods=["PUT"])